@@ -0,0 +1,107 @@
+"""
+Нагрузочная проверка полного цикла мониторинга monitor_tasks() на имитациях Google API и Telegram Bot API.
+Сеть не используется, нужен только config.py.
+
+Для каждого сценария измеряется:
+- время первого цикла (полное чтение таблиц, постановка в очередь тревог по всем просроченным задачам);
+- время доставки тревог обработчиком очереди: от начала первого цикла до получения последнего сообщения
+  имитацией телеграм;
+- среднее время и количество обращений к Google API в последующих инкрементальных циклах;
+- время цикла во время недоступности Google API (2 сек ответов 503).
+
+Лимит запросов к Google API в проверке не действует, чтобы измерять работу самого цикла.
+Запуск из корня проекта:
+    python -m benchmarks.bench_cycle
+"""
+import random
+import sys
+import tempfile
+import time
+
+from loguru import logger
+
+import main
+from benchmarks import workload
+from benchmarks.fake_telegram import FakeTelegramServer
+from services.common.token_bucket import TokenBucket
+from services.google_table.google_tb_work import open_workbooks
+from services.monitoring.alert_state import AlertState
+from services.monitoring.deadline_scheduler import DeadlineScheduler
+from services.telegram.alert_queue import AlertQueue
+from services.telegram.send_teleg import NotifTelegram
+
+# Сценарии: (таблиц, задач в таблице, чатов, задержка Google API, сек, доля ошибок Google API)
+SCENARIOS = [
+    (1, 100, 1, 0.05, 0),
+    (1, 1000, 1, 0.05, 0),
+    (1, 10000, 3, 0.05, 0),
+    (4, 1000, 1, 0.05, 0),
+    (1, 1000, 1, 0.05, 0.1),
+]
+INCREMENTAL_CYCLES = 5
+# Максимальное время ожидания доставки тревог, сек
+DELIVERY_TIMEOUT = 600
+
+
+def run_scenario(count_workbooks: int, count_tasks: int, count_chats: int, latency: float,
+                 error_rate: float) -> dict:
+    """
+    Выполняем циклы мониторинга по сценарию
+    :return: Словарь с результатами измерений
+    """
+    gc, keys = workload.make_client(count_workbooks, count_tasks, count_chats, latency=latency,
+                                    error_rate=error_rate, monitor_task_id=main.TASK_ID_MONITOR)
+    telegram = FakeTelegramServer(latency=0.02).start()
+    wks = open_workbooks(keys, gc, quota=TokenBucket(1000, 1000))
+    cache_dir = tempfile.mkdtemp()
+    for wk in wks:
+        wk.CONFIG_CACHE_DIR = cache_dir
+    queue = AlertQueue(':memory:')
+    main.setup(wks, NotifTelegram(api_url=telegram.url), AlertState(':memory:'), queue)
+    main.alert_sender.start()
+    scheduler = DeadlineScheduler(main.TASK_ID_IGNOR)
+
+    time_start = time.monotonic()
+    calls_first = main.monitor_tasks(scheduler, incremental=True)
+    time_first = time.monotonic() - time_start
+    while len(queue) and time.monotonic() - time_start < DELIVERY_TIMEOUT:
+        time.sleep(0.05)
+    messages = telegram.pop_messages()
+    delivery = max(message[0] for message in messages) - time_start if messages else 0
+
+    times, calls = [], []
+    for _ in range(INCREMENTAL_CYCLES):
+        time_start = time.monotonic()
+        calls += [main.monitor_tasks(scheduler, incremental=True)]
+        times += [time.monotonic() - time_start]
+
+    gc.outage(2)
+    time_start = time.monotonic()
+    main.monitor_tasks(scheduler, incremental=True)
+    time_outage = time.monotonic() - time_start
+
+    main.alert_sender.stop()
+    main.close_notif_telegram()
+    telegram.stop()
+    return {
+        'first': time_first, 'calls_first': calls_first, 'messages': len(messages), 'delivery': delivery,
+        'cycle': sum(times) / len(times), 'calls': sum(calls) / len(calls), 'outage': time_outage,
+    }
+
+
+def main_bench():
+    random.seed(1)
+    logger.remove()
+    logger.add(sys.stderr, level='CRITICAL')
+    print(f"{'таблиц':>6} {'задач':>6} {'чатов':>5} {'ошибок':>6} | {'1-й цикл':>8} {'API':>4} {'сообщ.':>6} "
+          f"{'доставка':>8} | {'цикл':>6} {'API':>4} | {'сбой API':>8}")
+    for count_workbooks, count_tasks, count_chats, latency, error_rate in SCENARIOS:
+        result = run_scenario(count_workbooks, count_tasks, count_chats, latency, error_rate)
+        print(f"{count_workbooks:>6} {count_tasks:>6} {count_chats:>5} {error_rate:>6.0%} | "
+              f"{result['first']:>8.3f} {result['calls_first']:>4} {result['messages']:>6} "
+              f"{result['delivery']:>8.3f} | {result['cycle']:>6.3f} {result['calls']:>4.1f} | "
+              f"{result['outage']:>8.3f}")
+
+
+if __name__ == "__main__":
+    main_bench()
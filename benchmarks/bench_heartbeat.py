@@ -0,0 +1,85 @@
+"""
+Нагрузочная проверка приёмника сигналов о запуске задач.
+
+Измеряется время обработки сигнала хранилищем и пропускная способность приёма по UDP и HTTP.
+Запуск из корня проекта:
+    python -m benchmarks.bench_heartbeat
+"""
+import http.client
+import socket
+import time
+
+from services.monitoring.heartbeat_server import HeartbeatServer, HeartbeatStore
+
+COUNT_TASKS = 1000
+
+
+def bench_store(count: int) -> float:
+    """Среднее время обработки одного сигнала хранилищем, мкс"""
+    store = HeartbeatStore()
+    time_start = time.perf_counter()
+    for i in range(count):
+        store.beat(str(i % COUNT_TASKS))
+    return (time.perf_counter() - time_start) / count * 1_000_000
+
+
+def wait_received(server: HeartbeatServer, count: int, timeout: float = 5) -> int:
+    """
+    Ждём, пока приёмник обработает `count` сигналов или количество обработанных сигналов перестанет расти
+    :return: Количество обработанных сигналов
+    """
+    time_end = time.monotonic() + timeout
+    received = -1
+    while time.monotonic() < time_end and server.store.count_beats not in (count, received):
+        received = server.store.count_beats
+        time.sleep(0.05)
+    return server.store.count_beats
+
+
+def bench_udp(count: int) -> tuple[float, int]:
+    """Пропускная способность приёма по UDP, сигналов в секунду, и количество обработанных сигналов"""
+    server = HeartbeatServer(port=0)
+    server.start()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    messages = [str(i % COUNT_TASKS).encode() for i in range(count)]
+    time_start = time.perf_counter()
+    # Отправляем пачками по COUNT_TASKS сигналов и ждём их обработки, чтобы измерять скорость приёма,
+    # а не скорость заполнения буфера сокета
+    for i in range(0, count, COUNT_TASKS):
+        for message in messages[i:i + COUNT_TASKS]:
+            sock.sendto(message, server.udp_address)
+        wait_received(server, min(i + COUNT_TASKS, count))
+    received = server.store.count_beats
+    rate = received / (time.perf_counter() - time_start)
+    sock.close()
+    server.stop()
+    return rate, received
+
+
+def bench_http(count: int) -> tuple[float, int]:
+    """Пропускная способность приёма по HTTP с постоянным соединением, запросов в секунду"""
+    server = HeartbeatServer(port=0)
+    server.start()
+    conn = http.client.HTTPConnection(*server.http_address)
+    time_start = time.perf_counter()
+    for i in range(count):
+        conn.request('GET', f'/heartbeat?task_id={i % COUNT_TASKS}')
+        conn.getresponse().read()
+    rate = count / (time.perf_counter() - time_start)
+    received = wait_received(server, count)
+    conn.close()
+    server.stop()
+    return rate, received
+
+
+def main():
+    print(f"Хранилище: {bench_store(1_000_000):.2f} мкс на сигнал")
+    rate, received = bench_udp(100_000)
+    # UDP не гарантирует доставку: при переполнении буфера сокета часть датаграмм теряется
+    print(f"UDP: {rate:,.0f} сигналов/сек, обработано {received} из 100000")
+    rate, received = bench_http(10_000)
+    print(f"HTTP: {rate:,.0f} запросов/сек, обработано {received} из 10000")
+
+
+if __name__ == "__main__":
+    main()
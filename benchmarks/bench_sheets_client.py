@@ -0,0 +1,95 @@
+"""
+Проверка устойчивости клиента Google таблиц на имитации Google API: повторы при ошибках сервера,
+выполнение запросов в пределах лимита и объединение одинаковых одновременных запросов.
+
+Лимит Google API (60 запросов в минуту) для скорости проверки уменьшен по времени в 20 раз: 60 запросов за 3 сек.
+Запуск из корня проекта (нужен config.py):
+    python -m benchmarks.bench_sheets_client
+"""
+import threading
+import time
+
+from benchmarks.fake_gspread import FakeClient
+from services.common.token_bucket import TokenBucket
+from services.google_table.google_tb_work import API_QUOTA_BURST, API_QUOTA_RATE, RWGoogle
+
+KEY = 'workbook'
+QUOTA = 60
+QUOTA_WINDOW = 3
+TIME_SCALE = 60 / QUOTA_WINDOW
+
+
+def make_rw(gc: FakeClient, quota: TokenBucket) -> RWGoogle:
+    """Клиент Google таблицы с паузами повторов, уменьшенными в TIME_SCALE раз"""
+    rw = RWGoogle(KEY, gc, quota)
+    rw.BACKOFF_BASE = RWGoogle.BACKOFF_BASE / TIME_SCALE
+    rw.BACKOFF_MAX = RWGoogle.BACKOFF_MAX / TIME_SCALE
+    rw.open_workbook()
+    return rw
+
+
+def make_sheets() -> list[list[list[str]]]:
+    return [[['h'], [str(i)]] for i in range(6)]
+
+
+def bench_quota(count: int, quota: TokenBucket) -> tuple[float, int, int]:
+    """
+    Выполняем `count` запросов чтения подряд
+    :return: Кортеж (время выполнения, сек, количество прочитанных страниц, количество ответов 429)
+    """
+    gc = FakeClient({KEY: make_sheets()}, quota=QUOTA, quota_window=QUOTA_WINDOW)
+    rw = make_rw(gc, quota)
+    time_start = time.perf_counter()
+    done = sum(rw.read_sheet(i % 6) is not None for i in range(count))
+    return time.perf_counter() - time_start, done, gc.count_errors.get(429, 0)
+
+
+def bench_errors(count: int, error_rate: float) -> tuple[int, int]:
+    """
+    Выполняем `count` запросов чтения при доле ошибок сервера `error_rate`
+    :return: Кортеж (количество прочитанных страниц, количество ответов 503)
+    """
+    gc = FakeClient({KEY: make_sheets()}, error_rate=error_rate)
+    rw = make_rw(gc, TokenBucket(1000, 1000))
+    done = sum(rw.read_sheet(i % 6) is not None for i in range(count))
+    return done, gc.count_errors.get(503, 0)
+
+
+def bench_coalescing(threads: int) -> tuple[int, int]:
+    """
+    Читаем одну страницу одновременно из `threads` потоков
+    :return: Кортеж (количество запросов к API, количество потоков, получивших данные)
+    """
+    gc = FakeClient({KEY: make_sheets()}, latency=0.2)
+    rw = make_rw(gc, TokenBucket(1000, 1000))
+    count_requests = gc.count_requests
+    results = []
+    workers = [threading.Thread(target=lambda: results.append(rw.read_sheet(1))) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return gc.count_requests - count_requests, sum(result is not None for result in results)
+
+
+def main():
+    count = 150
+    rate = API_QUOTA_RATE * TIME_SCALE
+    burst = API_QUOTA_BURST
+    time_quota, done, rejected = bench_quota(count, TokenBucket(rate, burst))
+    print(f"С лимитом запросов: {done}/{count} страниц за {time_quota:.2f} сек, "
+          f"{count / time_quota:.1f} запросов/сек, ответов 429: {rejected}")
+    time_quota, done, rejected = bench_quota(count, TokenBucket(1000, 1000))
+    print(f"Без лимита запросов: {done}/{count} страниц за {time_quota:.2f} сек, "
+          f"{count / time_quota:.1f} запросов/сек, ответов 429: {rejected}")
+    print(f"Допустимо: {QUOTA / QUOTA_WINDOW:.1f} запросов/сек")
+
+    done, errors = bench_errors(1000, 0.2)
+    print(f"20% ошибок 503: прочитано {done}/1000 страниц, ошибок повторено: {errors}")
+
+    count_requests, done = bench_coalescing(20)
+    print(f"Одновременное чтение одной страницы из 20 потоков: {count_requests} запрос(ов), получили данные {done}")
+
+
+if __name__ == "__main__":
+    main()
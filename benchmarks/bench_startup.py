@@ -0,0 +1,125 @@
+"""
+Проверка времени запуска main.py в режиме cron.
+
+Измеряется:
+- время импорта main в отдельном процессе (медиана нескольких запусков, вместе с запуском интерпретатора)
+  и самые долгие модули по данным `python -X importtime`;
+- время получения токена доступа Google API при первом обращении к API: без сохранённого токена
+  (подпись JWT и запрос к серверу авторизации) и с токеном, сохранённым предыдущим запуском.
+  Сервер авторизации имитируется локальным HTTP сервером с задержкой ответа TOKEN_LATENCY.
+
+Запуск из корня проекта (нужен config.py):
+    python -m benchmarks.bench_startup
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import rsa
+from google.auth.transport.requests import Request
+
+from services.google_table import google_tb_work
+
+RUNS = 5
+TOP_MODULES = 8
+# Задержка ответа имитации сервера авторизации Google, сек
+TOKEN_LATENCY = 0.15
+
+
+def import_wall_clock(runs: int = RUNS) -> float:
+    """Медиана времени выполнения `python -c "import main"`, сек"""
+    times = []
+    for _ in range(runs):
+        time_start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'import main'], check=True)
+        times += [time.perf_counter() - time_start]
+    return statistics.median(times)
+
+
+def import_times() -> tuple[int, list[tuple[int, str]]]:
+    """
+    Время импорта по данным `python -X importtime`
+    :return: Кортеж (время импорта main, мкс, список (время, мкс, модуль) модулей, импортируемых main напрямую)
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'],
+                            check=True, capture_output=True, text=True)
+    total, modules = 0, []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if name.strip() == 'main':
+            total = int(cumulative)
+        elif name.startswith('   ') and not name.startswith('    '):
+            modules += [(int(cumulative), name.strip())]
+    return total, sorted(modules, reverse=True)
+
+
+class _TokenHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(TOKEN_LATENCY)
+        body = json.dumps({'access_token': 'token', 'expires_in': 3600, 'token_type': 'Bearer'}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_credentials(path: str, token_uri: str) -> None:
+    """Создаём ключ сервисного аккаунта с новым ключом RSA и адресом имитации сервера авторизации"""
+    _, private_key = rsa.newkeys(2048)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'type': 'service_account', 'project_id': 'bench', 'private_key_id': '1',
+            'private_key': private_key.save_pkcs1().decode('ascii'), 'client_email': 'bench@bench.iam',
+            'client_id': '1', 'token_uri': token_uri,
+        }, f)
+
+
+def token_time() -> float:
+    """Время создания клиента Google API и получения действующего токена доступа, сек"""
+    time_start = time.perf_counter()
+    gc = google_tb_work.authorize_client()
+    if not gc.auth.valid:
+        gc.auth.refresh(Request(gc.session))
+    elapsed = time.perf_counter() - time_start
+    google_tb_work.save_token(gc.auth)
+    return elapsed
+
+
+def main():
+    wall_clock = import_wall_clock()
+    total, modules = import_times()
+    print(f"Импорт main: {wall_clock:.3f} сек вместе с запуском интерпретатора, "
+          f"по данным -X importtime {total / 1e6:.3f} сек")
+    for cumulative, name in modules[:TOP_MODULES]:
+        print(f"  {cumulative / 1e6:>7.3f}  {name}")
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _TokenHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    directory = tempfile.mkdtemp()
+    google_tb_work.CREDENTIALS_FILE = os.path.join(directory, 'credentials.json')
+    google_tb_work.TOKEN_CACHE_FILE = os.path.join(directory, 'google_token.json')
+    make_credentials(google_tb_work.CREDENTIALS_FILE, f'http://127.0.0.1:{server.server_address[1]}/token')
+
+    time_new = token_time()
+    time_cached = token_time()
+    server.shutdown()
+    print(f"Токен Google API (задержка сервера авторизации {TOKEN_LATENCY} сек): "
+          f"новый {time_new:.3f} сек, сохранённый {time_cached:.3f} сек")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Сравнение преобразования строк страницы задач: словарь с разбором дат через strptime и parse_task_row().
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_task_parse
+"""
+import datetime as dt
+import random
+import time
+
+from services.google_table.task import parse_task_row
+
+TASK_KEYS = ['task_id', 'task_name', 'time_start', 'time_finish', 'task_interval', 'status_name', 'status_id',
+             'date_start', 'repeat', 'retry_count', 'last_start', 'temp_not1', 'temp_not2']
+
+
+def generate_rows(count: int) -> list[list[str]]:
+    """
+    Генерируем строки страницы задач в формате Google таблицы
+    :param count: Количество строк
+    :return: list[list[str]]
+    """
+    now = dt.datetime.now()
+    rows = []
+    for i in range(count):
+        last_start = now - dt.timedelta(seconds=random.randint(0, 3600))
+        rows += [[
+            str(i), f'Задача {i}', f'{random.randint(0, 23):02d}-00', '23-59', str(random.choice([60, 300, 3600])),
+            'Статус', '1', '01.11.2023', random.choice(['да', 'нет']), '3',
+            last_start.strftime('%Y-%m-%d %H:%M:%S'), 'Шаблон 1', 'Шаблон 2'
+        ]]
+    return rows
+
+
+def parse_rows_strptime(rows: list[list[str]]) -> list[dict]:
+    """Преобразование строк в словари, как до перехода на Task"""
+    tasks = []
+    i = 2
+    for val in rows:
+        task = dict(zip(TASK_KEYS, val))
+        date_start = dt.datetime.strptime(task['date_start'], '%d.%m.%Y')
+        if (dt.datetime.utcnow() - date_start).days > 365:
+            date_start = dt.datetime.utcnow() - dt.timedelta(days=364)
+        task['date_start'] = date_start
+        task['last_start'] = dt.datetime.strptime(task['last_start'], '%Y-%m-%d %H:%M:%S')
+        task['time_start'] = dt.datetime.strptime(task['time_start'], '%H-%M').time()
+        task['time_finish'] = dt.datetime.strptime(task['time_finish'], '%H-%M').time()
+        repeat = task['repeat'].lower()
+        task['repeat'] = True if repeat == "да" else False if repeat == "нет" else None
+        task['row_task_on_sheet'] = i
+        tasks += [task]
+        i += 1
+    return tasks
+
+
+def parse_rows_task(rows: list[list[str]]) -> list:
+    """Преобразование строк в Task"""
+    utc_now = dt.datetime.utcnow()
+    return [parse_task_row(val, i, utc_now) for i, val in enumerate(rows, start=2)]
+
+
+def measure(func, *args) -> float:
+    """Время выполнения функции, сек"""
+    time_start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - time_start
+
+
+def main():
+    random.seed(1)
+    print(f"{'строк':>10} {'strptime, сек':>14} {'Task, сек':>10} {'ускорение':>10}")
+    for count in (1_000, 10_000, 100_000):
+        rows = generate_rows(count)
+        time_dict = measure(parse_rows_strptime, rows)
+        time_task = measure(parse_rows_task, rows)
+        print(f"{count:>10} {time_dict:>14.4f} {time_task:>10.4f} {time_dict / time_task:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Сравнение проверки интервалов запуска задач: цикл по задачам и векторная проверка TaskTable.
+Для TaskTable измеряется заполнение массивов по всем задачам (первый цикл) и обновление 1% задач
+на месте (следующие циклы, в которых изменилась колонка 'last_start' части задач).
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_task_table
+"""
+import dataclasses
+import datetime as dt
+import random
+import time
+
+from services.google_table.task import Task
+from services.monitoring.task_table import TaskTable
+
+
+def generate_tasks(count: int) -> list[Task]:
+    """
+    Генерируем задачи в формате WorkGoogle.get_tasks()
+    :param count: Количество задач
+    :return: list[Task]
+    """
+    now = dt.datetime.now()
+    tasks = []
+    for i in range(count):
+        interval = random.choice([30, 60, 300, 3600])
+        tasks += [Task(
+            task_id=str(i),
+            task_name=f'Задача {i}',
+            time_start=dt.time(random.randint(0, 23), random.choice([0, 30])),
+            time_finish=dt.time(random.randint(0, 23), 59),
+            task_interval=interval,
+            status_name='',
+            status_id='',
+            date_start=now,
+            repeat=None,
+            retry_count='',
+            last_start=now - dt.timedelta(seconds=random.randint(0, interval * 6)),
+            temp_not1='',
+            temp_not2='',
+            row_task_on_sheet=i + 2,
+            workbook='',
+        )]
+    return tasks
+
+
+def check_time_interval_loop(tasks: list[Task]) -> list[dict]:
+    """Проверка интервалов циклом по задачам, как до перехода на TaskTable"""
+    alert = []
+    for task in tasks:
+        time_interval = task.task_interval
+        task_delta_interval = int((dt.datetime.now() - task.last_start).total_seconds())
+
+        time_now = dt.datetime.now().time()
+        start_time = (dt.datetime.combine(dt.date(1, 1, 1), task.time_start) + dt.timedelta(seconds=20)).time()
+        end_time = task.time_finish
+        if start_time < end_time:
+            is_working_hours = (start_time <= time_now <= end_time)
+        else:
+            is_working_hours = (time_now <= end_time or time_now >= start_time)
+
+        if task_delta_interval > time_interval * 3 and is_working_hours:
+            alert += [{
+                'task_id': task.task_id,
+                'task_name': task.task_name,
+                'task_last_start': task.last_start,
+                'time_interval': time_interval,
+                'task_delta_interval': task_delta_interval,
+            }]
+    return alert
+
+
+def measure(func, *args) -> tuple[float, object]:
+    """Время выполнения функции, сек, и её результат"""
+    time_start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - time_start, result
+
+
+def main():
+    random.seed(1)
+    print(f"{'задач':>10} {'цикл, сек':>12} {'заполнение, сек':>16} {'обновление, сек':>16} {'проверка, сек':>14} "
+          f"{'тревог':>16}")
+    for count in (1_000, 100_000, 1_000_000):
+        tasks = generate_tasks(count)
+        time_loop, alert_loop = measure(check_time_interval_loop, tasks)
+        time_fill, table = measure(TaskTable, tasks)
+        time_check, alert_table = measure(table.check_time_interval)
+        changed = random.sample(range(count), count // 100)
+        for i in changed:
+            tasks[i] = dataclasses.replace(tasks[i], last_start=dt.datetime.now())
+        time_update, _ = measure(table.update, tasks, changed)
+        # Количество тревог может немного различаться для задач на границе интервала,
+        # так как цикл получает текущее время для каждой задачи
+        alerts = f"{len(alert_loop)}/{len(alert_table)}"
+        print(f"{count:>10} {time_loop:>12.4f} {time_fill:>16.4f} {time_update:>16.4f} {time_check:>14.4f} "
+              f"{alerts:>16}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Имитация клиента gspread для нагрузочных проверок без обращения к Google API.
+
+Поддерживает задержку ответа, ограничение количества запросов за окно времени (ответ 429 при превышении),
+случайные и заданные заранее ошибки сервера, периоды недоступности сервера. Передаётся в RWGoogle и WorkGoogle параметром `gc`.
+"""
+import random
+import threading
+import time
+from collections import deque
+
+import gspread
+
+
+class FakeResponse:
+    """Ответ Google API с ошибкой в формате, который разбирает gspread.exceptions.APIError"""
+    def __init__(self, status_code: int, retry_after: int = None):
+        self.status_code = status_code
+        self.headers = {'Retry-After': str(retry_after)} if retry_after is not None else {}
+        self.text = f'Ошибка {status_code}'
+
+    def json(self) -> dict:
+        return {'error': {'code': self.status_code, 'message': self.text, 'status': 'FAKE'}}
+
+
+class FakeWorksheet:
+    def __init__(self, client: 'FakeClient', title: str, values: list[list[str]]):
+        self._client = client
+        self.title = title
+        self.values = values
+
+    def get_all_values(self) -> list[list[str]]:
+        self._client.request()
+        return [list(row) for row in self.values]
+
+    def _set(self, row: int, col: int, value: str) -> None:
+        while len(self.values) < row:
+            self.values.append([])
+        cells = self.values[row - 1]
+        while len(cells) < col:
+            cells.append('')
+        cells[col - 1] = value
+
+    def update_cell(self, row: int, col: int, value: str) -> dict:
+        self._client.request()
+        self._set(row, col, value)
+        return {}
+
+    def batch_update(self, data: list[dict], **kwargs) -> dict:
+        self._client.request()
+        for item in data:
+            row, col = gspread.utils.a1_to_rowcol(item['range'])
+            self._set(row, col, item['values'][0][0])
+        return {}
+
+
+class FakeSpreadsheet:
+    def __init__(self, client: 'FakeClient', sheets: list[list[list[str]]]):
+        self._client = client
+        self.sheets = [FakeWorksheet(client, f'Лист{i + 1}', values) for i, values in enumerate(sheets)]
+
+    def worksheets(self) -> list[FakeWorksheet]:
+        self._client.request()
+        return list(self.sheets)
+
+    def _range(self, range_name: str) -> dict:
+        title, _, cells = range_name.partition('!')
+        sheet = next((sheet for sheet in self.sheets if sheet.title == title.strip("'")), None)
+        if sheet is None:
+            # Google API отвечает 400 "Unable to parse range" на диапазон несуществующей страницы
+            raise self._client.reject(400)
+        values = sheet.values
+        if cells:
+            row, col = gspread.utils.a1_to_rowcol(cells.split(':')[0])
+            values = [[row_values[col - 1]] if len(row_values) >= col else [] for row_values in values[row - 1:]]
+        return {'range': range_name, 'values': [list(row) for row in values]}
+
+    def values_batch_get(self, ranges: list[str], params: dict = None) -> dict:
+        self._client.request()
+        return {'valueRanges': [self._range(range_name) for range_name in ranges]}
+
+    def values_get(self, range_name: str, params: dict = None) -> dict:
+        self._client.request()
+        return self._range(range_name)
+
+
+class FakeAuth:
+    valid = True
+
+
+class FakeClient:
+    """
+    Клиент Google API с таблицами в памяти.
+    Методы потокобезопасны.
+    """
+    def __init__(self, workbooks: dict[str, list[list[list[str]]]], latency: float = 0,
+                 quota: int = None, quota_window: float = 60, error_rate: float = 0):
+        """
+        :param workbooks: Значения страниц таблиц {идентификатор таблицы: [значения страницы, ...]}
+        :param latency: Задержка ответа на каждый запрос, сек
+        :param quota: Допустимое количество запросов за `quota_window` сек. None - без ограничения
+        :param quota_window: Окно ограничения количества запросов, сек
+        :param error_rate: Доля запросов, завершающихся ошибкой 503
+        """
+        self.workbooks = {key: FakeSpreadsheet(self, sheets) for key, sheets in workbooks.items()}
+        self.latency = latency
+        self.quota = quota
+        self.quota_window = quota_window
+        self.error_rate = error_rate
+        self.auth = FakeAuth()
+        self.count_requests = 0  # Количество запросов, в том числе завершившихся ошибкой
+        self.count_errors: dict[int, int] = {}  # Код ошибки -> количество
+        self._errors = deque()
+        self._outage_until = 0.0
+        self._requests = deque()
+        self._lock = threading.Lock()
+
+    def fail_next(self, *statuses: int) -> None:
+        """Завершаем следующие запросы ошибками с кодами `statuses` по порядку"""
+        with self._lock:
+            self._errors.extend(statuses)
+
+    def outage(self, seconds: float) -> None:
+        """Сервер отвечает ошибкой 503 на все запросы в течение `seconds` сек"""
+        with self._lock:
+            self._outage_until = time.monotonic() + seconds
+
+    def request(self) -> None:
+        """
+        Учитываем запрос и имитируем задержку ответа
+        :raise gspread.exceptions.APIError: Если запрос должен завершиться ошибкой
+        """
+        with self._lock:
+            self.count_requests += 1
+            now = time.monotonic()
+            while self._requests and now - self._requests[0] >= self.quota_window:
+                self._requests.popleft()
+            status = None
+            if self._errors:
+                status = self._errors.popleft()
+            elif now < self._outage_until:
+                status = 503
+            elif self.quota is not None and len(self._requests) >= self.quota:
+                status = 429
+            elif self.error_rate and random.random() < self.error_rate:
+                status = 503
+            else:
+                self._requests.append(now)
+            if status is not None:
+                self.count_errors[status] = self.count_errors.get(status, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+        if status is not None:
+            raise gspread.exceptions.APIError(FakeResponse(status))
+
+    def reject(self, status: int) -> gspread.exceptions.APIError:
+        """Учитываем ошибку, найденную при разборе запроса, и получаем исключение для неё"""
+        with self._lock:
+            self.count_errors[status] = self.count_errors.get(status, 0) + 1
+        return gspread.exceptions.APIError(FakeResponse(status))
+
+    def open_by_key(self, key: str) -> FakeSpreadsheet:
+        self.request()
+        return self.workbooks[key]
+
+    def login(self) -> None:
+        self.request()
@@ -0,0 +1,109 @@
+"""
+Имитация Telegram Bot API для нагрузочных проверок без обращения к телеграм.
+
+Локальный HTTP сервер принимает запросы sendMessage, отвечает с заданной задержкой,
+может отвечать ошибкой 429 с указанием времени повтора и сохраняет время получения каждого сообщения.
+Адрес сервера передаётся в NotifTelegram параметром `api_url`.
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.fake.add_connection()
+
+    def do_POST(self):
+        server: FakeTelegramServer = self.server.fake
+        params = parse_qs(self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8'))
+        time.sleep(server.latency)
+        if server.take_error() or (server.error_rate and random.random() < server.error_rate):
+            status, result = 429, {'ok': False, 'error_code': 429, 'description': 'Too Many Requests',
+                                   'parameters': {'retry_after': server.retry_after}}
+        else:
+            status, result = 200, {'ok': True, 'result': {}}
+            server.add_message(params['chat_id'][0], params['text'][0])
+        body = json.dumps(result).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeTelegramServer:
+    """
+    Сервер-имитация Bot API.
+    Полученные сообщения хранятся в `messages` кортежами (time.monotonic() получения, идентификатор чата, текст).
+    """
+    def __init__(self, latency: float = 0, error_rate: float = 0, retry_after: int = 1):
+        """
+        :param latency: Задержка ответа, сек
+        :param error_rate: Доля запросов, на которые отвечаем ошибкой 429
+        :param retry_after: Время повтора в ответе 429, сек
+        """
+        self.latency = latency
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.messages: list[tuple[float, str, str]] = []
+        self.count_connections = 0  # Количество принятых TCP соединений
+        self.count_requests = 0  # Количество запросов sendMessage
+        self._errors = 0  # Количество следующих запросов, на которые отвечаем ошибкой 429
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        """Адрес сервера для параметра `api_url` NotifTelegram"""
+        return f'http://127.0.0.1:{self._server.server_address[1]}'
+
+    def fail_next(self, count: int = 1) -> None:
+        """Отвечаем ошибкой 429 на следующие `count` запросов"""
+        with self._lock:
+            self._errors += count
+
+    def take_error(self) -> bool:
+        """Учитываем запрос и проверяем, нужно ли ответить на него ошибкой по `fail_next`"""
+        with self._lock:
+            self.count_requests += 1
+            if self._errors:
+                self._errors -= 1
+                return True
+            return False
+
+    def add_message(self, chat_id: str, text: str) -> None:
+        with self._lock:
+            self.messages.append((time.monotonic(), chat_id, text))
+
+    def add_connection(self) -> None:
+        with self._lock:
+            self.count_connections += 1
+
+    def pop_messages(self) -> list[tuple[float, str, str]]:
+        """Получаем сообщения, полученные с предыдущего вызова"""
+        with self._lock:
+            messages, self.messages = self.messages, []
+            return messages
+
+    def start(self) -> 'FakeTelegramServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
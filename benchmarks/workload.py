@@ -0,0 +1,80 @@
+"""
+Генератор синтетической нагрузки: Google таблицы с заданным количеством задач, долей просроченных задач
+и количеством чатов получателей тревог для имитации Google API из benchmarks.fake_gspread.
+"""
+import datetime as dt
+import random
+
+from benchmarks.fake_gspread import FakeClient
+
+INTERVALS = (30, 60, 300, 3600)
+
+
+def task_rows(count: int, overdue: float = 0.1, now: dt.datetime = None,
+              monitor_task_id: str = None) -> list[list[str]]:
+    """
+    Строки страницы задач с заголовком
+    :param count: Количество задач
+    :param overdue: Доля задач, пропустивших больше трёх интервалов запуска
+    :param now: Текущий момент времени. По умолчанию datetime.datetime.now()
+    :param monitor_task_id: Идентификатор задачи мониторинга, добавляется первой строкой
+    :return: list[list[str]]
+    """
+    now = now or dt.datetime.now()
+    rows = [['task_id', 'task_name', 'time_start', 'time_finish', 'task_interval', 'status_name', 'status_id',
+             'date_start', 'repeat', 'retry_count', 'last_start', 'temp_not1', 'temp_not2']]
+    task_ids = [str(i) for i in range(1, count + 1) if str(i) != monitor_task_id]
+    if monitor_task_id is not None:
+        task_ids = [monitor_task_id] + task_ids[:count - 1]
+    for task_id in task_ids:
+        interval = random.choice(INTERVALS)
+        if task_id != monitor_task_id and random.random() < overdue:
+            last_start = now - dt.timedelta(seconds=interval * 4)
+        else:
+            last_start = now - dt.timedelta(seconds=random.randint(0, interval))
+        rows += [[
+            task_id, f'Задача {task_id}', '00-00', '23-59', str(interval), 'Статус', '1', '01.01.2024',
+            random.choice(['да', 'нет']), '3', last_start.strftime('%Y-%m-%d %H:%M:%S'), '', ''
+        ]]
+    return rows
+
+
+def workbook_sheets(count_tasks: int, count_chats: int, overdue: float = 0.1,
+                    monitor_task_id: str = None) -> list[list[list[str]]]:
+    """
+    Значения страниц одной Google таблицы в порядке, который ожидает WorkGoogle
+    :param count_tasks: Количество задач
+    :param count_chats: Количество чатов получателей тревог
+    :param overdue: Доля просроченных задач
+    :param monitor_task_id: Идентификатор задачи мониторинга
+    :return: Список значений страниц
+    """
+    chats_id = ', '.join(str(100000 + i) for i in range(count_chats))
+    return [
+        [['work_open', 'work_close', 'auth_api'], ['9', '18', '']],
+        task_rows(count_tasks, overdue, monitor_task_id=monitor_task_id),
+        [['task_id', 'status_id', 'user_name', 'user_id', 'manager_id', 'tel_chat_id', 'reorder_auto'],
+         ['1', '144931', 'Получатель', '1', '1', chats_id, '']],
+        [['supplier_id']],
+        [['user_id']],
+        [['tel_chat_id'], [chats_id]],
+    ]
+
+
+def make_client(count_workbooks: int = 1, count_tasks: int = 100, count_chats: int = 1, overdue: float = 0.1,
+                latency: float = 0, error_rate: float = 0,
+                monitor_task_id: str = None) -> tuple[FakeClient, list[str]]:
+    """
+    Создаём имитацию Google API с несколькими одинаково заполненными Google таблицами
+    :param count_workbooks: Количество таблиц
+    :param count_tasks: Количество задач в каждой таблице
+    :param count_chats: Количество чатов получателей тревог
+    :param overdue: Доля просроченных задач
+    :param latency: Задержка ответа на каждый запрос, сек
+    :param error_rate: Доля запросов, завершающихся ошибкой 503
+    :param monitor_task_id: Идентификатор задачи мониторинга
+    :return: Кортеж (клиент, идентификаторы таблиц)
+    """
+    keys = [f'workbook-{i}' for i in range(count_workbooks)]
+    workbooks = {key: workbook_sheets(count_tasks, count_chats, overdue, monitor_task_id) for key in keys}
+    return FakeClient(workbooks, latency=latency, error_rate=error_rate), keys
@@ -1,12 +1,26 @@
 # Author Loik Andrey mail: loikand@mail.ru
-from typing import List, Any
+from typing import List, Any, Optional
 
+import config
 from config import FILE_NAME_LOG, TASK_ID_IGNOR
 from loguru import logger
+import argparse
+import dataclasses
 import datetime as dt
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-from services.google_table.google_tb_work import WorkGoogle
-from services.telegram.send_teleg import NotifTelegram
+from services.common.metrics import METRICS, profile_call, serve_metrics
+from services.google_table.google_tb_work import WorkGoogle, open_workbooks
+from services.google_table.task import Task
+from services.monitoring.alert_state import AlertState
+from services.monitoring.deadline_scheduler import DeadlineScheduler
+from services.monitoring.heartbeat_server import HeartbeatServer, HeartbeatStore
+from services.monitoring.task_table import TaskTable
+from services.telegram.alert_queue import AlertQueue, AlertSender
+from services.telegram.send_teleg import DIGEST_THRESHOLD, NotifTelegram
 
 # Задаём параметры логирования
 logger.add(FILE_NAME_LOG,
@@ -15,47 +29,154 @@ logger.add(FILE_NAME_LOG,
            rotation="1 week",
            compression="zip")
 
-wk_g = WorkGoogle()
+# Идентификатор задачи этого скрипта в основной Google таблице. Если не задан, то время работы скрипта не записывается
+TASK_ID_MONITOR = getattr(config, 'TASK_ID_MONITOR', None)
 
+# Максимальное количество Google таблиц, читаемых параллельно.
+# Не больше размера пула соединений общего клиента Google API (10)
+WORKBOOK_WORKERS = 8
 
-def notif_alert(list_alert: list[dict]):
+# Контролируемые Google таблицы с общим клиентом Google API, первая таблица - основная,
+# хранилище состояния тревог, очередь уведомлений и её обработчик. Создаются в setup()
+workbooks: list[WorkGoogle] = []
+wk_g: WorkGoogle = None
+alert_state: AlertState = None
+alert_queue: AlertQueue = None
+alert_sender: AlertSender = None
+# Клиент телеграм создаётся только при первой тревоге, см. get_notif_telegram()
+notif_telegram: NotifTelegram = None
+digest_threshold = DIGEST_THRESHOLD
+_notif_telegram_lock = threading.Lock()
+
+
+def setup(wks: list[WorkGoogle] = None, telegram: NotifTelegram = None, state: AlertState = None,
+          queue: AlertQueue = None) -> None:
+    """
+    Создаём клиент Google, хранилище состояния тревог и очередь уведомлений.
+    Вместо любого из них можно передать свой объект, например работающий с имитацией API для нагрузочных проверок.
+    :param wks: Контролируемые Google таблицы. По умолчанию таблицы из настроек, см. `open_workbooks`
+    :param telegram: Клиент телеграм. По умолчанию создаётся при первой тревоге, см. `get_notif_telegram`
+    :param state: Хранилище состояния тревог
+    :param queue: Очередь уведомлений
     """
-    Отправляем уведомления о тревоге в телеграмм
+    global workbooks, wk_g, notif_telegram, alert_state, alert_queue, alert_sender
+    workbooks = wks or open_workbooks()
+    wk_g = workbooks[0]
+    notif_telegram = telegram
+    alert_state = state if state is not None else AlertState(task_id_ignor=TASK_ID_IGNOR)
+    alert_queue = queue if queue is not None else AlertQueue()
+    alert_sender = AlertSender(alert_queue, get_notif_telegram)
+    if TASK_ID_MONITOR is None:
+        logger.error("В config.py не задан TASK_ID_MONITOR. Время работы скрипта в Google таблицу не записывается")
+
+
+def get_notif_telegram() -> NotifTelegram:
+    """
+    Получаем клиент телеграм. Клиент создаётся при первом вызове, поэтому запуск без тревог обходится без него
+    :return: NotifTelegram
+    """
+    global notif_telegram
+    with _notif_telegram_lock:
+        if notif_telegram is None:
+            notif_telegram = NotifTelegram(digest_threshold=digest_threshold)
+        return notif_telegram
+
+
+def close_notif_telegram() -> None:
+    """Закрываем соединения клиента телеграм, если он был создан"""
+    if notif_telegram is not None:
+        notif_telegram.close()
+
+
+def get_workbook(workbook: str) -> Optional[WorkGoogle]:
+    """
+    Получаем объект контролируемой Google таблицы по её метке
+    :param workbook: Метка таблицы, см. `Task.workbook`
+    :return: WorkGoogle или None для неизвестной метки
+    """
+    for wk in workbooks:
+        if wk.workbook == workbook:
+            return wk
+    return None
+
+
+def notif_alert(list_alert: list[dict], list_recovered: list[dict] = ()) -> int:
+    """
+    Добавляем уведомления о тревоге в очередь отправки в телеграмм.
+    Тревоги каждой Google таблицы отправляются получателям тревог этой таблицы.
+    Сообщения отправляет обработчик очереди `alert_sender`, поэтому цикл мониторинга не ждёт ответа телеграм.
     :param list_alert:
         Список словарей с ключами:
                 'task_id': str or int,
                 'task_name': str,
                 'task_last_start': datetime.datetime(%Y, %m, %d, %H, %M, %S'),
                 'time_interval': int,
-                'task_delta_interval': int
+                'task_delta_interval': int,
+                'workbook': str
+    :param list_recovered:
+        Список восстановившихся задач, полученный из AlertState.filter_alerts()
+    :return: Количество сообщений, добавленных в очередь
     """
-    notif_telegram = NotifTelegram()
+    with METRICS.stage('notif_alert'):
+        count = _notif_alert(list_alert, list_recovered)
+    if count:
+        alert_sender.wake()
+    return count
+
 
+def _notif_alert(list_alert: list[dict], list_recovered: list[dict]) -> int:
+    """Добавляем в очередь уведомления о тревоге получателям тревог каждой Google таблицы, см. `notif_alert`"""
+    count = 0
+    for workbook in dict.fromkeys(task.get('workbook', '') for task in [*list_alert, *list_recovered]):
+        wk = get_workbook(workbook)
+        if wk is None:
+            logger.error(f"Не найдена Google таблица {workbook}. Уведомления по её задачам не отправлены")
+            continue
+        count += notif_alert_workbook(
+            wk,
+            [alert for alert in list_alert if alert.get('workbook', '') == workbook],
+            [task for task in list_recovered if task.get('workbook', '') == workbook]
+        )
+    return count
+
+
+def notif_alert_workbook(wk: WorkGoogle, list_alert: list[dict], list_recovered: list[dict]) -> int:
+    """
+    Добавляем в очередь уведомления о тревоге по задачам одной Google таблицы.
+    Состояние тревог записывается, только если уведомления добавлены в очередь, иначе тревоги
+    будут отобраны для уведомления снова в следующей проверке.
+    :param wk: Google таблица, со страницы получателей тревог которой берутся чаты для отправки
+    :param list_alert: Список тревог таблицы
+    :param list_recovered: Список восстановившихся задач таблицы
+    :return: Количество сообщений, добавленных в очередь
+    """
     # Получаем список чатов для отправки уведомлений
-    user_notif = wk_g.users_alert_notif()[0]['tel_chat_id']
+    users_alert_notif = wk.users_alert_notif()
+    if not users_alert_notif:
+        logger.error(f"Не удалось получить получателей тревог, уведомления не отправлены. Таблица: '{wk.workbook}'")
+        return 0
+    user_notif = users_alert_notif[0]['tel_chat_id']
     user_notif = user_notif.replace(' ', '').split(',')
 
-    logger.info(f"Отправляем уведомления о тревоге в телеграмм пользователям {user_notif}")
-    for alert in list_alert:
-        # Генерируем текст сообщения
-        alert['task_last_start'] = alert['task_last_start'].strftime('%Y-%m-%d %H:%M:%S')
-        notif_telegram.message_alert(alert)
+    logger.info(f"Добавляем в очередь уведомления о тревоге в телеграмм пользователям {user_notif}")
+    alerts_text = [{**alert, 'task_last_start': alert['task_last_start'].strftime('%Y-%m-%d %H:%M:%S')}
+                   for alert in list_alert]
+
+    # Генерируем тексты сообщений: по одному на тревогу или сводку, если тревог много
+    telegram = get_notif_telegram()
+    messages = telegram.messages_alert(alerts_text) if alerts_text else []
+    messages += [telegram.message_recovered(task) for task in list_recovered]
 
-        # Отправляем сообщение в чаты телеграмм
-        for chat_id in user_notif:
-            notif_telegram.send_massage_chat(chat_id)
-    return
+    # Сообщения сохраняются в очереди до подтверждения отправки во все чаты
+    count = alert_queue.put(messages, user_notif)
+    alert_state.mark_notified(list_alert, list_recovered)
+    return count
 
 
-def check_time_interval(tasks: list[dict]) -> list[dict]:
+def check_time_interval(tasks: list[Task]) -> list[dict]:
     """
     Проверяем есть ли нарушения в интервале времени между запусками задачи
-    :param tasks:
-        Список словарей с ключами:
-            'task_id' - str or int
-            'task_name',- str,
-            'last_start' - datetime.datetime(%Y, %m, %d, %H, %M, %S'),
-            'task_interval' - str or int
+    :param tasks: Список задач, полученный из WorkGoogle.get_tasks()
     :return:
         Список словарей с ключами:
             'task_id': str or int,
@@ -63,73 +184,321 @@ def check_time_interval(tasks: list[dict]) -> list[dict]:
             'task_last_start': datetime.datetime(%Y, %m, %d, %H, %M, %S'),
             'time_interval': int,
             'task_delta_interval': int,
+            'repeat': bool,
     """
-    alert: list[dict] = []
-    for task in tasks:
-        time_interval = int(task['task_interval'])
-        task_delta_interval = (dt.datetime.now() - task['last_start']).seconds
-        is_working_hours = check_working_hours(task)
-
-        # Проверяем, что скрипт пропустил уже 3 допустимых интервала запуска и сейчас рабочее время этого скрипта
-        if (task_delta_interval > time_interval * 3 and is_working_hours
-                and task['task_id'] not in TASK_ID_IGNOR):
-            logger.info(f"Найдена ошибка в интервале запуска задачи: {task['task_id']}")
-            alert += [{
-                'task_id': task['task_id'],
-                'task_name': task['task_name'],
-                'task_last_start': task['last_start'],
-                'time_interval': time_interval,
-                'task_delta_interval': task_delta_interval,
-            }]
+    with METRICS.stage('check_time_interval'):
+        alert = TaskTable(tasks, TASK_ID_IGNOR).check_time_interval()
+    for task in alert:
+        logger.info(f"Найдена ошибка в интервале запуска задачи: {task['task_id']}")
     return alert
 
 
-def check_working_hours(task):
+def check_workbooks(wks: list[WorkGoogle]) -> list[dict]:
     """
-    Проверяем возможность запуска задачи согласно заданного интервала времени.
+    Проверяем есть ли нарушения в интервале времени между запусками задач всех Google таблиц.
+    Проверка выполняется по таблицам задач `WorkGoogle.task_table`, которые хранятся между циклами.
+    :param wks: Google таблицы
+    :return: Список тревог в формате результата `check_time_interval`
+    """
+    now = dt.datetime.now()
+    with METRICS.stage('check_time_interval'):
+        alert = [task for wk in wks for task in wk.task_table.check_time_interval(now)]
+    for task in alert:
+        logger.info(f"Найдена ошибка в интервале запуска задачи: {task['task_id']}")
+    return alert
 
-    Находим задачу по ключу 'task_id' и проверяем прошёл ли заданный интервал 'task_interval'
-    Добавлен в словарь ключ возможности запуска задачи `can_run_task`.
-        Ключ принимает значение True, если интервал с последнего запуска уже прошёл.
-        Ключ принимает значение False, если интервал с последнего запуска ещё не прошёл.
+
+def apply_heartbeats(tasks: list[Task], heartbeats: HeartbeatStore = None) -> list[Task]:
+    """
+    Подставляем в задачи время последнего запуска, полученное приёмником сигналов, если оно новее,
+    чем в Google таблице. Задачи не изменяются, для обновлённых задач создаются копии.
+    :param tasks: Список задач
+    :param heartbeats: Хранилище сигналов о запуске задач
+    :return: Список задач
     """
-    delta = dt.timedelta(seconds=20)
-    date_now = dt.datetime.now()
-    time_now = date_now.time()
+    if heartbeats is None:
+        return tasks
+    result = []
+    for task in tasks:
+        last_start = heartbeats.get(task.key)
+        if last_start is not None and last_start > task.last_start:
+            task = dataclasses.replace(task, last_start=last_start)
+        result += [task]
+    return result
 
-    # Добавляем delta к старту задачи(погрешность на работу скрипта)
-    start_time = (dt.datetime.combine(dt.date(1, 1, 1), task['time_start']) + delta).time()
 
-    # Проверяем возможен ли запуск выполнения задачи в текущее время
-    end_time = task['time_finish']
-    if start_time < end_time:
-        is_working_hours = (start_time <= time_now <= end_time)
-    else:
-        is_working_hours = (time_now <= end_time or time_now >= start_time)
-    return is_working_hours
+def apply_heartbeats_workbook(wk: WorkGoogle, tasks: list[Task], heartbeats: HeartbeatStore = None) -> list[Task]:
+    """
+    Подставляем в задачи Google таблицы время последнего запуска, полученное приёмником сигналов,
+    и обновляем обновлённые задачи в таблице задач `wk.task_table`
+    :param wk: Google таблица
+    :param tasks: Список задач таблицы в порядке `wk.task_table`
+    :param heartbeats: Хранилище сигналов о запуске задач
+    :return: Список задач
+    """
+    result = apply_heartbeats(tasks, heartbeats)
+    if result is not tasks:
+        wk.task_table.update_tasks({i: task for i, (task_wk, task) in enumerate(zip(tasks, result))
+                                    if task is not task_wk})
+    return result
 
 
-def monitor_tasks():
+def read_workbook(wk: WorkGoogle, incremental: bool = False) -> Optional[list[Task]]:
     """
-    Проверяем регулярность запуска задач
+    Получаем задачи одной Google таблицы в начале цикла мониторинга
+    :param wk: Google таблица
+    :param incremental: Инкрементальное чтение задач
+    :return: Список задач или None, если получить страницу задач не удалось
     """
-    # Получаем задачи из Google Таблицы
-    tasks = wk_g.get_tasks()
+    with METRICS.stage('get_tasks'):
+        # Получаем данные всех нужных страниц Google Таблицы одним запросом
+        wk.start_cycle(incremental)
+        tasks = wk.get_tasks(incremental)
+    if tasks is None:
+        METRICS.inc('tasks_read_errors_total', workbook=wk.workbook)
+        return None
+    METRICS.set('tasks_monitored', len(tasks), workbook=wk.workbook)
+    METRICS.set('tasks_parse_errors', len(wk.tasks_errors), workbook=wk.workbook)
+    return tasks
 
-    # Проверяем нарушения время запуска задач
-    list_alert = check_time_interval(tasks)
 
-    # Отправляем уведомления о тревоге в телеграмм
+def write_workbook(wk: WorkGoogle) -> int:
+    """
+    Записываем накопленное время запуска задач в Google таблицу и завершаем цикл мониторинга таблицы
+    :param wk: Google таблица
+    :return: Количество обращений к Google API за цикл
+    """
+    with METRICS.stage('set_tasks_last_start'):
+        wk.flush_last_start()
+    count_api_calls = wk.end_cycle()
+    METRICS.set('google_api_requests_cycle', count_api_calls, workbook=wk.workbook)
+    return count_api_calls
+
+
+def queue_heartbeats(heartbeats: HeartbeatStore) -> None:
+    """
+    Добавляем время запуска задач, полученное приёмником сигналов, в очереди записи их Google таблиц.
+    Таблица и строка задачи находятся по ключу задачи среди задач последнего чтения таблиц.
+    Сигналы задач, которых нет ни в одной таблице, не записываются.
+    :param heartbeats: Хранилище сигналов о запуске задач
+    """
+    updates = heartbeats.pop_updates()
+    if not updates:
+        return
+    tasks = {task.key: (wk, task) for wk in workbooks for task in wk.last_tasks}
+    for key, last_start in updates.items():
+        if key not in tasks:
+            logger.warning(f"Сигнал о запуске неизвестной задачи {key} не записан в Google таблицу")
+            continue
+        wk, task = tasks[key]
+        wk.queue_last_start(last_start.strftime('%Y-%m-%d %H:%M:%S'), row=task.row_task_on_sheet)
+
+
+def monitor_tasks(scheduler: DeadlineScheduler = None, incremental: bool = False,
+                  heartbeats: HeartbeatStore = None, wks: list[WorkGoogle] = None) -> int:
+    """
+    Проверяем регулярность запуска задач.
+    Все Google таблицы читаются параллельно, их задачи проверяются вместе, тревоги помечаются меткой таблицы.
+    :param scheduler: Планировщик сроков задач. Если передан, то проверяются только задачи,
+        срок которых уже наступил, остальные проверяются планировщиком по наступлению их срока.
+    :param incremental: Инкрементальное чтение задач: в каждом цикле читается только колонка 'last_start'
+    :param heartbeats: Хранилище сигналов о запуске задач. Если передано, то время последнего запуска
+        берётся из него, а полученные сигналы записываются в Google таблицу
+    :param wks: Контролируемые Google таблицы. По умолчанию все таблицы из настроек
+    :return: Количество обращений к Google API за цикл
+    """
+    wks = wks or workbooks
+    with METRICS.timer('cycle_seconds'), ThreadPoolExecutor(max_workers=min(WORKBOOK_WORKERS, len(wks))) as executor:
+        # Получаем задачи из всех Google Таблиц. Если страницу задач таблицы получить не удалось,
+        # то проверяем задачи этой таблицы, полученные предыдущим чтением
+        tasks_workbooks = list(executor.map(lambda wk: read_workbook(wk, incremental), wks))
+        read_failed = [wk.workbook or 'основная'
+                       for wk, tasks_workbook in zip(wks, tasks_workbooks) if tasks_workbook is None]
+        if read_failed:
+            logger.warning(f"Не удалось получить задачи таблиц {read_failed}. Используем задачи предыдущего чтения")
+        tasks_workbooks = [wk.last_tasks if tasks_workbook is None else tasks_workbook
+                           for wk, tasks_workbook in zip(wks, tasks_workbooks)]
+        if heartbeats is not None and not read_failed:
+            heartbeats.set_known(task.key for tasks_workbook in tasks_workbooks for task in tasks_workbook)
+        tasks = [task for wk, tasks_workbook in zip(wks, tasks_workbooks)
+                 for task in apply_heartbeats_workbook(wk, tasks_workbook, heartbeats)]
+
+        # Проверяем нарушения время запуска задач
+        if scheduler is None:
+            list_alert = check_workbooks(wks)
+            overdue = len(list_alert)
+        else:
+            # После неудачного чтения список задач неполный: планировщик не обновляем,
+            # иначе он удалит задачи, которые не удалось получить
+            if not read_failed:
+                scheduler.update(tasks)
+            list_alert = check_time_interval(scheduler.pop_due(dt.datetime.now()))
+            # Планировщик возвращает только задачи, срок которых наступил. Просроченные считаем по таблицам задач
+            overdue = sum(wk.task_table.count_overdue() for wk in wks)
+        METRICS.set('tasks_overdue', overdue)
+
+        # Оставляем только тревоги, по которым ещё не отправлялись уведомления, и находим восстановившиеся задачи.
+        # После неудачного чтения состояние задач не удаляем и восстановление не проверяем
+        with METRICS.stage('filter_alerts'):
+            list_alert, list_recovered = alert_state.filter_alerts(list_alert, None if read_failed else tasks)
+
+        # Добавляем уведомления о тревоге в очередь отправки в телеграмм
+        if list_alert or list_recovered:
+            notif_alert(list_alert, list_recovered)
+        METRICS.set('alerts_active', len(alert_state))
+
+        # Записываем время запуска задач, полученное приёмником сигналов, и время выполнения в Google таблицы
+        if heartbeats is not None:
+            queue_heartbeats(heartbeats)
+        if TASK_ID_MONITOR is not None:
+            time_end = dt.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            wks[0].queue_last_start(time_end, task_id=TASK_ID_MONITOR)
+        count_api_calls = sum(executor.map(write_workbook, wks))
+    logger.info(f"Обращений к Google API за цикл: {count_api_calls}")
+    return count_api_calls
+
+
+def check_deadlines(scheduler: DeadlineScheduler, heartbeats: HeartbeatStore = None):
+    """
+    Проверяем задачи, срок которых наступил между чтениями Google таблицы
+    :param scheduler: Планировщик сроков задач
+    :param heartbeats: Хранилище сигналов о запуске задач
+    """
+    tasks_due = scheduler.pop_due(dt.datetime.now())
+    tasks = apply_heartbeats(tasks_due, heartbeats)
+
+    # Задачи, о запуске которых получен сигнал, возвращаем в планировщик с новым сроком
+    for task_due, task in zip(tasks_due, tasks):
+        if task is not task_due:
+            scheduler.update_task(task)
+
+    list_alert = check_time_interval(tasks)
+    list_alert, _ = alert_state.filter_alerts(list_alert)
     if list_alert:
         notif_alert(list_alert)
 
-    # Записываем время выполнения в Google таблицу
-    time_end = dt.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    wk_g.set_tasks_last_start(6, time_end)
+
+def run_daemon(period: int, heartbeat_port: int = 0, metrics_port: int = 0, metrics_json: str = None,
+               profile: str = None) -> None:
+    """
+    Запускаем проверку задач в режиме службы.
+    Клиенты Google и Telegram создаются один раз и используются во всех циклах проверки.
+    Google таблица читается с периодом `period`, а задачи проверяются планировщиком в момент наступления их срока,
+    поэтому пропуск запуска обнаруживается сразу, а не в следующем цикле чтения таблицы.
+    Работа завершается по сигналу SIGTERM или SIGINT после окончания текущего цикла.
+    :param period: Период чтения Google таблицы, сек
+    :param heartbeat_port: Порт приёма сигналов о запуске задач по UDP и HTTP. 0 - приём не запускается
+    :param metrics_port: Порт HTTP сервера метрик. 0 - сервер не запускается
+    :param metrics_json: Файл, в который сохраняются метрики после каждого цикла чтения Google таблиц
+    :param profile: Файл, в который сохраняется профиль первого цикла чтения Google таблиц
+    """
+    stop_event = threading.Event()
+
+    def stop(signum, frame):
+        logger.info(f"Получен сигнал {signum}. Завершаем работу после текущего цикла")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    scheduler = DeadlineScheduler(TASK_ID_IGNOR)
+    next_sync = time.monotonic()
+
+    heartbeat_server = None
+    heartbeats = None
+    if heartbeat_port:
+        heartbeat_server = HeartbeatServer(port=heartbeat_port)
+        heartbeat_server.start()
+        heartbeats = heartbeat_server.store
+
+    metrics_server = serve_metrics(metrics_port) if metrics_port else None
+    # Уведомления, не отправленные до перезапуска, отправляются первыми
+    alert_sender.start()
+
+    logger.info(f"Запуск в режиме службы с периодом проверки {period} сек")
+    while not stop_event.is_set():
+        if time.monotonic() >= next_sync:
+            time_start = time.perf_counter()
+            try:
+                # Клиент Google API общий для всех таблиц
+                wk_g.refresh_auth()
+                if profile:
+                    profile_call(profile, monitor_tasks, scheduler, incremental=True, heartbeats=heartbeats)
+                    profile = None
+                else:
+                    monitor_tasks(scheduler, incremental=True, heartbeats=heartbeats)
+            except Exception as e:
+                logger.error(f"Ошибка в цикле проверки задач: {e}")
+                METRICS.inc('cycle_errors_total')
+            if metrics_json:
+                METRICS.dump_json(metrics_json)
+            time_cycle = time.perf_counter() - time_start
+            logger.info(f"Цикл проверки выполнен за {time_cycle:.3f} сек")
+            next_sync = time.monotonic() + max(period - time_cycle, 0)
+        else:
+            try:
+                check_deadlines(scheduler, heartbeats)
+            except Exception as e:
+                logger.error(f"Ошибка при проверке сроков задач: {e}")
+                METRICS.inc('cycle_errors_total')
+            METRICS.set('scheduler_tasks', len(scheduler))
+
+        # Ждём ближайшего из событий: срока задачи или следующего чтения Google таблицы
+        timeout = next_sync - time.monotonic()
+        next_deadline = scheduler.next_deadline()
+        if next_deadline is not None:
+            timeout = min(timeout, (next_deadline - dt.datetime.now()).total_seconds())
+        stop_event.wait(max(timeout, 0))
+
+    alert_sender.stop()
+    close_notif_telegram()
+    if metrics_server is not None:
+        metrics_server.shutdown()
+    if heartbeat_server is not None:
+        heartbeat_server.stop()
+        # Записываем в Google таблицы сигналы, полученные после последнего цикла
+        queue_heartbeats(heartbeats)
+        for wk in workbooks:
+            wk.flush_last_start()
+
+
+def parse_args() -> argparse.Namespace:
+    """Получаем параметры запуска из командной строки"""
+    parser = argparse.ArgumentParser(description="Контроль регулярности запуска задач")
+    parser.add_argument('--daemon', action='store_true', help="Запуск в режиме службы с периодической проверкой")
+    parser.add_argument('--period', type=int, default=30, help="Период проверки в режиме службы, сек")
+    parser.add_argument('--digest-threshold', type=int, default=DIGEST_THRESHOLD,
+                        help="Количество тревог за цикл, начиная с которого они отправляются одной сводкой. "
+                             "0 - отправлять каждую тревогу отдельным сообщением")
+    parser.add_argument('--heartbeat-port', type=int, default=0,
+                        help="Порт приёма сигналов о запуске задач по UDP и HTTP в режиме службы. "
+                             "0 - приём не запускается")
+    parser.add_argument('--metrics-port', type=int, default=0,
+                        help="Порт HTTP сервера метрик в режиме службы: /metrics - формат Prometheus, "
+                             "/metrics.json - JSON. 0 - сервер не запускается")
+    parser.add_argument('--metrics-json', default=None,
+                        help="Файл, в который сохраняются метрики после каждого цикла проверки")
+    parser.add_argument('--profile', default=None,
+                        help="Файл, в который сохраняется профиль cProfile одного (первого) цикла проверки")
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
+    args = parse_args()
+    digest_threshold = args.digest_threshold
+    setup()
     logger.info("Начало")
-    monitor_tasks()
+    if args.daemon:
+        run_daemon(args.period, args.heartbeat_port, args.metrics_port, args.metrics_json, args.profile)
+    elif args.profile:
+        profile_call(args.profile, monitor_tasks)
+    else:
+        monitor_tasks()
+    if not args.daemon:
+        # Отправляем уведомления из очереди. Неотправленные останутся в очереди до следующего запуска
+        alert_sender.process()
+    close_notif_telegram()
+    if args.metrics_json:
+        METRICS.dump_json(args.metrics_json)
     logger.info("Работа программы завершена")
 
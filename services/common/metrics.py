@@ -0,0 +1,213 @@
+import bisect
+import contextlib
+import contextvars
+import io
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Iterator
+
+from loguru import logger
+
+# Границы интервалов гистограмм длительности, сек
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_stage: contextvars.ContextVar[str] = contextvars.ContextVar('stage', default='')
+
+
+class Metrics:
+    """
+    Реестр метрик: счётчики, показатели текущего значения и гистограммы длительности.
+    Каждая метрика хранится по имени и набору меток, например ('google_api_requests_total', (('status', '200'),)).
+    Метрики выдаются в текстовом формате Prometheus или в виде словаря для сохранения в JSON.
+    Методы потокобезопасны.
+    """
+    def __init__(self):
+        self._counters: dict[tuple[str, tuple], float] = {}
+        self._gauges: dict[tuple[str, tuple], float] = {}
+        self._histograms: dict[tuple[str, tuple], list] = {}  # [счётчики интервалов, сумма, количество]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple[str, tuple]:
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """Увеличиваем счётчик"""
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels) -> None:
+        """Устанавливаем текущее значение показателя"""
+        key = self._key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """Добавляем значение в гистограмму"""
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * (len(DURATION_BUCKETS) + 1), 0.0, 0]
+            histogram[0][bisect.bisect_left(DURATION_BUCKETS, value)] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    @contextlib.contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """Измеряем длительность блока и добавляем её в гистограмму `name`"""
+        time_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - time_start, **labels)
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Измеряем длительность этапа цикла мониторинга.
+        Пока этап выполняется, запросы к внешним API в этом потоке учитываются с меткой этапа, см. `current_stage`.
+        """
+        token = _stage.set(name)
+        try:
+            with self.timer('cycle_stage_seconds', stage=name):
+                yield
+        finally:
+            _stage.reset(token)
+
+    @staticmethod
+    def current_stage() -> str:
+        """Этап цикла мониторинга, выполняемый в текущем потоке, или 'none'"""
+        return _stage.get() or 'none'
+
+    def reset(self) -> None:
+        """Очищаем все метрики"""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    @staticmethod
+    def _labels(labels: tuple, extra: str = '') -> str:
+        items = [f'{key}="{value}"' for key, value in labels] + ([extra] if extra else [])
+        return '{' + ','.join(items) + '}' if items else ''
+
+    def render_prometheus(self) -> str:
+        """Метрики в текстовом формате Prometheus"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = sorted((key, (list(buckets), total, count))
+                                for key, (buckets, total, count) in self._histograms.items())
+
+        lines = []
+        types = set()
+        for metric_type, items in (('counter', counters), ('gauge', gauges)):
+            for (name, labels), value in items:
+                if name not in types:
+                    types.add(name)
+                    lines += [f'# TYPE {name} {metric_type}']
+                lines += [f'{name}{self._labels(labels)} {value:g}']
+        for (name, labels), (buckets, total, count) in histograms:
+            if name not in types:
+                types.add(name)
+                lines += [f'# TYPE {name} histogram']
+            cumulative = 0
+            for bound, bucket in zip((*DURATION_BUCKETS, '+Inf'), buckets):
+                cumulative += bucket
+                le = f'le="{bound}"'
+                lines += [f'{name}_bucket{self._labels(labels, le)} {cumulative}']
+            lines += [f'{name}_sum{self._labels(labels)} {total:g}', f'{name}_count{self._labels(labels)} {count}']
+        return '\n'.join(lines) + '\n'
+
+    def to_dict(self) -> dict:
+        """
+        Метрики в виде словаря для сохранения в JSON
+        :return: {'counters': [...], 'gauges': [...], 'histograms': [...]}, где элемент списка -
+            словарь с ключами 'name', 'labels', 'value' (для гистограмм - 'count', 'sum', 'buckets')
+        """
+        with self._lock:
+            return {
+                'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                             for (name, labels), value in sorted(self._counters.items())],
+                'gauges': [{'name': name, 'labels': dict(labels), 'value': value}
+                           for (name, labels), value in sorted(self._gauges.items())],
+                'histograms': [{'name': name, 'labels': dict(labels), 'count': count, 'sum': total,
+                                'buckets': dict(zip(map(str, (*DURATION_BUCKETS, '+Inf')), buckets))}
+                               for (name, labels), (buckets, total, count) in sorted(self._histograms.items())],
+            }
+
+    def dump_json(self, path: str) -> None:
+        """Сохраняем метрики в JSON файл"""
+        try:
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(self.to_dict(), f, ensure_ascii=False, indent=1)
+            os.replace(path + '.tmp', path)
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении метрик в файл {path}: {e}")
+
+
+# Общий реестр метрик процесса
+METRICS = Metrics()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Запрос GET /metrics - метрики в формате Prometheus, GET /metrics.json - в формате JSON"""
+    def do_GET(self):
+        if self.path == '/metrics':
+            body, content_type = METRICS.render_prometheus(), 'text/plain; version=0.0.4'
+        elif self.path == '/metrics.json':
+            body, content_type = json.dumps(METRICS.to_dict(), ensure_ascii=False), 'application/json'
+        else:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """
+    Запускаем HTTP сервер метрик в фоновом потоке
+    :param port: Порт
+    :param host: Адрес
+    :return: Сервер. Для остановки вызвать shutdown()
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"Метрики доступны по адресу http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+def profile_call(path: str, func: Callable, *args, **kwargs):
+    """
+    Выполняем функцию под профилировщиком cProfile и сохраняем статистику в файл.
+    Файл можно открыть модулем pstats или программами просмотра, например snakeviz.
+    :param path: Путь к файлу статистики
+    :param func: Функция, например один цикл мониторинга
+    :return: Результат `func`
+    """
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        profiler.dump_stats(path)
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(15)
+        logger.info(f"Профиль цикла сохранён в {path}\n{stream.getvalue()}")
@@ -0,0 +1,56 @@
+import threading
+from typing import Any, Callable, Hashable
+
+
+class _Call:
+    """Выполняющийся запрос и его результат"""
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+
+class SingleFlight:
+    """
+    Объединение одинаковых одновременных запросов.
+
+    Если запрос с тем же ключом уже выполняется в другом потоке, то новый запрос не выполняется,
+    а ждёт и получает результат (или исключение) выполняющегося. Результаты после завершения запроса не хранятся.
+    Методы потокобезопасны.
+    """
+    def __init__(self):
+        self._calls: dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.count_shared = 0  # Количество запросов, получивших результат выполняющегося запроса
+
+    def do(self, key: Hashable, func: Callable, *args, **kwargs) -> Any:
+        """
+        Выполняем `func(*args, **kwargs)` или ждём результат такого же выполняющегося запроса
+        :param key: Ключ запроса. Запросы с одинаковым ключом должны возвращать одинаковый результат
+        :param func: Функция запроса
+        :return: Результат `func`
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.count_shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
@@ -0,0 +1,55 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты запросов по алгоритму "ведро с токенами".
+
+    Ведро вмещает `capacity` токенов и пополняется со скоростью `rate` токенов в секунду.
+    Каждый запрос забирает токен. Если токенов нет, запрос должен подождать, пока ведро пополнится.
+    Методы потокобезопасны.
+    """
+    def __init__(self, rate: float, capacity: float):
+        """
+        :param rate: Скорость пополнения, токенов в секунду
+        :param capacity: Вместимость ведра (допустимое количество запросов подряд без ожидания)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._time = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        """Пополняем ведро за время, прошедшее с предыдущего обращения"""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._time) * self.rate)
+        self._time = now
+
+    def reserve(self, tokens: float = 1) -> float:
+        """
+        Забираем токены из ведра, в том числе в долг
+        :param tokens: Количество токенов
+        :return: Время ожидания, сек, после которого можно выполнять запрос
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+            return max(0.0, -self._tokens / self.rate)
+
+    def acquire(self, tokens: float = 1) -> None:
+        """Забираем токены из ведра и ждём, если токенов не хватает"""
+        delay = self.reserve(tokens)
+        if delay:
+            time.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Запрещаем запросы на `seconds` сек, например по ответу сервера о превышении лимита.
+        Следующий запрос одного токена будет ждать `seconds` сек.
+        :param seconds: Время паузы, сек
+        """
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, 1 - seconds * self.rate)
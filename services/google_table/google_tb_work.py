@@ -1,29 +1,265 @@
-import datetime
+import atexit
+import dataclasses
+import json
+import os
+import random
+import threading
+import time
+from typing import Callable, Optional
 
 import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+import requests
+from google.oauth2.service_account import Credentials
 
-from config import AUTH_GOOGLE
+from config import AUTH_GOOGLE, TASK_ID_IGNOR
 from loguru import logger
 import datetime as dt
 
+from services.common.metrics import METRICS
+from services.common.single_flight import SingleFlight
+from services.common.token_bucket import TokenBucket
+from services.google_table.task import Task, clip_date_start, parse_task_row, parse_yes_no
+from services.monitoring.task_table import TaskTable
+
+# Лимит Google Sheets API - 60 запросов в минуту на пользователя.
+# Скорость и запас выбраны так, чтобы за любую минуту выполнялось не больше 0.8 * 60 + 12 = 60 запросов:
+# короткие всплески выполняются сразу, а длинные растягиваются во времени, а не отклоняются сервером
+API_QUOTA_RATE = 0.8
+API_QUOTA_BURST = 12
+# Общий лимит запросов для всех Google таблиц процесса
+API_QUOTA = TokenBucket(API_QUOTA_RATE, API_QUOTA_BURST)
+
+# Ключ сервисного аккаунта Google
+CREDENTIALS_FILE = 'services/google_table/credentials.json'
+# Файл, в котором токен доступа Google API сохраняется между запусками до окончания срока его действия
+TOKEN_CACHE_FILE = 'cache/google_token.json'
+# Минимальный оставшийся срок действия сохранённого токена, при котором он используется, сек
+TOKEN_CACHE_MARGIN = 5 * 60
+
+
+def authorize_client() -> gspread.Client:
+    """
+    Создаём авторизованный клиент Google API.
+    Один клиент можно использовать для работы с несколькими Google таблицами.
+    Токен доступа берётся из `TOKEN_CACHE_FILE`, если срок его действия не истекает, иначе он запрашивается
+    при первом обращении к API. При завершении процесса действующий токен сохраняется для следующего запуска.
+    :return: gspread.Client
+    """
+    scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
+    credentials = Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=scope)
+    load_token(credentials)
+    gc = gspread.authorize(credentials)
+    gc.session.hooks['response'].append(_count_response_bytes)
+    atexit.register(save_token, credentials)
+    return gc
+
+
+def load_token(credentials: Credentials, path: str = None) -> bool:
+    """
+    Подставляем в учётные данные токен доступа, сохранённый предыдущим запуском
+    :param credentials: Учётные данные сервисного аккаунта
+    :param path: Файл токена. По умолчанию `TOKEN_CACHE_FILE`
+    :return: True, если сохранённый токен подставлен
+    """
+    path = path or TOKEN_CACHE_FILE
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        expiry = dt.datetime.fromisoformat(data['expiry'])
+    except FileNotFoundError:
+        return False
+    except Exception as e:
+        logger.warning(f"Не удалось прочитать сохранённый токен Google {path}: {e}")
+        return False
+    # Время окончания действия токена в google-auth - UTC без часового пояса
+    now = dt.datetime.now(dt.timezone.utc).replace(tzinfo=None)
+    if data.get('account') != credentials.service_account_email or \
+            (expiry - now).total_seconds() < TOKEN_CACHE_MARGIN:
+        return False
+    credentials.token = data['token']
+    credentials.expiry = expiry
+    return True
+
+
+def save_token(credentials: Credentials, path: str = None) -> None:
+    """
+    Сохраняем действующий токен доступа в файл, доступный для чтения только владельцу
+    :param credentials: Учётные данные сервисного аккаунта
+    :param path: Файл токена. По умолчанию `TOKEN_CACHE_FILE`
+    """
+    path = path or TOKEN_CACHE_FILE
+    if not credentials.token or credentials.expiry is None:
+        return
+    data = {'account': credentials.service_account_email, 'token': credentials.token,
+            'expiry': credentials.expiry.isoformat()}
+    try:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(os.open(path + '.tmp', os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(path + '.tmp', path)
+    except Exception as e:
+        logger.error(f"Ошибка при сохранении токена Google в файл {path}: {e}")
+
+
+def _count_response_bytes(response: requests.Response, *args, **kwargs) -> None:
+    """Учитываем размер ответа Google API в метриках"""
+    METRICS.inc('google_api_response_bytes_total', len(response.content), stage=METRICS.current_stage())
+
+
+def workbook_keys() -> list[str]:
+    """
+    Получаем идентификаторы контролируемых Google таблиц из настроек.
+    В AUTH_GOOGLE['KEY_WORKBOOK'] можно указать один идентификатор или список идентификаторов.
+    :return: list[str]. Первая таблица в списке - основная
+    """
+    keys = AUTH_GOOGLE['KEY_WORKBOOK']
+    return [keys] if isinstance(keys, str) else list(keys)
+
 
 class RWGoogle:
     """
-    Класс для чтения и запись данных из(в) Google таблицы(у)
+    Класс для чтения и запись данных из(в) Google таблицы(у).
+
+    Все запросы к Google API выполняются через `_call`: с учётом общего лимита запросов `API_QUOTA`
+    и с повторами при временных ошибках (429 и 5xx, ошибки соединения) с экспоненциально растущей паузой
+    со случайным разбросом. Одинаковые одновременные запросы чтения из разных потоков объединяются в один.
     """
-    def __init__(self):
+    # Коды ответа Google API, при которых запрос повторяется
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    # Количество попыток выполнения запроса
+    RETRY_ATTEMPTS = 5
+    # Пауза перед первым повтором и максимальная пауза между повторами, сек
+    BACKOFF_BASE = 1
+    BACKOFF_MAX = 32
+
+    def __init__(self, key_wb: str = None, gc: gspread.Client = None, quota: TokenBucket = None):
+        """
+        :param key_wb: Идентификатор Google таблицы. По умолчанию основная таблица из настроек
+        :param gc: Авторизованный клиент Google API. Если не передан, то создаётся новый
+        :param quota: Лимит запросов к Google API. По умолчанию общий для всех таблиц `API_QUOTA`
+        """
         self.client_id = AUTH_GOOGLE['GOOGLE_CLIENT_ID']
         self.client_secret = AUTH_GOOGLE['GOOGLE_CLIENT_SECRET']
-        self._scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
-        self._credentials = ServiceAccountCredentials.from_json_keyfile_name(
-            'services/google_table/credentials.json', self._scope
-            # 'credentials.json', self._scope
-        )
-        self._credentials._client_id = self.client_id
-        self._credentials._client_secret = self.client_secret
-        self._gc = gspread.authorize(self._credentials)
-        self.key_wb = AUTH_GOOGLE['KEY_WORKBOOK']
+        self._gc = gc or authorize_client()
+        self.key_wb = key_wb or workbook_keys()[0]
+        self._quota = quota or API_QUOTA
+        self._flight = SingleFlight()
+        self._wb = None
+        self._worksheets = []
+        self.count_api_calls = 0  # Количество обращений к Google API с момента последнего сброса счётчика
+
+    @staticmethod
+    def error_status(error: Exception) -> Optional[int]:
+        """Код ответа Google API из исключения или None для ошибок соединения"""
+        response = getattr(error, 'response', None)
+        return getattr(response, 'status_code', None)
+
+    def backoff(self, attempt: int, error: Exception) -> float:
+        """
+        Пауза перед повтором запроса. Если Google API указал время повтора, то используется оно.
+        :param attempt: Номер неудачной попытки, начиная с 1
+        :param error: Исключение неудачной попытки
+        :return: Пауза, сек
+        """
+        response = getattr(error, 'response', None)
+        retry_after = getattr(response, 'headers', {}).get('Retry-After')
+        if retry_after and str(retry_after).isdigit():
+            return float(retry_after)
+        delay = min(self.BACKOFF_MAX, self.BACKOFF_BASE * 2 ** (attempt - 1))
+        # Случайный разброс, чтобы повторы из разных потоков не приходили одновременно
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _call(self, func: Callable, *args, **kwargs):
+        """
+        Выполняем запрос к Google API с учётом лимита запросов и повторами при временных ошибках
+        :param func: Метод gspread, выполняющий запрос
+        :return: Результат `func`
+        :raise gspread.exceptions.APIError: Если ошибка не временная или попытки исчерпаны
+        """
+        method = getattr(func, '__name__', 'request')
+        stage = METRICS.current_stage()
+        for attempt in range(1, self.RETRY_ATTEMPTS + 1):
+            delay = self._quota.reserve()
+            if delay:
+                METRICS.inc('google_api_quota_wait_seconds_total', delay, stage=stage)
+                time.sleep(delay)
+            self.count_api_calls += 1
+            time_start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+                METRICS.observe('google_api_request_seconds', time.perf_counter() - time_start, method=method)
+                METRICS.inc('google_api_requests_total', method=method, stage=stage, status='ok')
+                return result
+            except (gspread.exceptions.APIError, requests.ConnectionError, requests.Timeout) as e:
+                status = self.error_status(e)
+                METRICS.observe('google_api_request_seconds', time.perf_counter() - time_start, method=method)
+                METRICS.inc('google_api_requests_total', method=method, stage=stage, status=status or 'connection')
+                if status is not None and 400 <= status < 500 and status not in self.RETRY_STATUSES:
+                    # Запрос не принят: возможно, страницы переименованы или удалены. Сохранённые объекты
+                    # таблицы и страниц сбрасываем, при следующем запросе таблица будет открыта заново
+                    self._wb = None
+                    self._worksheets = []
+                if (status is not None and status not in self.RETRY_STATUSES) or attempt == self.RETRY_ATTEMPTS:
+                    raise
+                delay = self.backoff(attempt, e)
+                logger.warning(f"Ошибка Google API {status or e}. Повтор через {delay:.1f} сек...")
+                if status == 429:
+                    # Превышен лимит: приостанавливаем все запросы, ожидание выполнит лимит запросов
+                    self._quota.pause(delay)
+                else:
+                    time.sleep(delay)
+
+    def _read(self, key: tuple, func: Callable, *args) -> list[list[str]]:
+        """
+        Выполняем запрос чтения. Одинаковые одновременные запросы выполняются один раз.
+        :param key: Ключ запроса
+        :param func: Функция чтения, возвращающая список строк
+        :return: List[List[str]]. Каждый вызов получает свою копию строк
+        """
+        return [list(row) for row in self._flight.do(key, func, *args)]
+
+    def open_workbook(self) -> gspread.Spreadsheet:
+        """
+        Открываем Google таблицу и сохраняем ссылку на неё и на объекты её страниц.
+        Таблица открывается один раз, повторные вызовы не обращаются к API.
+        После ошибки запроса 4xx таблица открывается заново, см. `_call`.
+        :return: gspread.Spreadsheet
+        """
+        if self._wb is None:
+            wb = self._call(self._gc.open_by_key, self.key_wb)
+            self._worksheets = self._call(wb.worksheets)
+            self._wb = wb
+        return self._wb
+
+    def get_worksheet(self, worksheet_id: int) -> gspread.Worksheet:
+        """
+        Получаем объект страницы Google таблицы по её идентификатору (порядковому номеру)
+        :param worksheet_id: Порядковый номер страницы, начиная с 0
+        :return: gspread.Worksheet
+        """
+        self.open_workbook()
+        return self._worksheets[worksheet_id]
+
+    def refresh_auth(self) -> None:
+        """
+        Обновляем токен доступа к Google API, только если срок его действия истёк.
+        Используется в режиме службы, где один клиент работает всё время жизни процесса.
+        """
+        try:
+            if not self._gc.auth.valid:
+                logger.info("Срок действия токена Google истёк. Обновляем токен")
+                self._call(self._gc.login)
+                save_token(self._gc.auth)
+        except Exception as e:
+            logger.error(f"Ошибка при обновлении токена доступа Google: {e}")
+
+    def reset_api_calls(self) -> int:
+        """
+        Сбрасываем счётчик обращений к Google API
+        :return: Значение счётчика до сброса
+        """
+        count_api_calls, self.count_api_calls = self.count_api_calls, 0
+        return count_api_calls
 
     def read_sheets(self) -> list[str]:
         """
@@ -40,49 +276,366 @@ class RWGoogle:
         """
         result = []
         try:
-            worksheets = self._gc.open_by_key(self.key_wb).worksheets()
-            result = [worksheet.title for worksheet in worksheets]
+            self.open_workbook()
+            result = [worksheet.title for worksheet in self._worksheets]
         except gspread.exceptions.APIError as e:
             logger.error(f"Ошибка при получении списка имён страниц: {e}")
         except Exception as e:
             logger.error(f"Ошибка при получении списка имён страниц: {e}")
         return result
 
-    def read_sheet(self, worksheet_id: int) -> list[list[str]]:
+    def read_sheet(self, worksheet_id: int) -> Optional[list[list[str]]]:
         """
         Получает данные из страницы Google таблицы по её идентификатору и возвращает значения в виде списка списков
         self.key_wb: id google таблицы.
             Идентификатор таблицы можно найти в URL-адресе таблицы.
             Обычно идентификатор представляет собой набор символов и цифр
             после `/d/` и перед `/edit` в URL-адресе таблицы.
-        :return: List[List[str].
+        :return: List[List[str]. Если получить данные не удалось, то возвращается None.
         """
-        sheet = []
         try:
-            sheet = self._gc.open_by_key(self.key_wb).get_worksheet(worksheet_id)
+            sheet = self.get_worksheet(worksheet_id)
+            return self._read(('sheet', worksheet_id), self._call, sheet.get_all_values)
         except gspread.exceptions.APIError as e:
-            logger.error(f"Ошибка при получении списка настроек: {e}")
+            logger.error(f"Ошибка при получении данных страницы {worksheet_id}: {e}")
         except Exception as e:
-            logger.error(f"Ошибка при получении списка имён страниц: {e}")
-        return sheet.get_all_values()
+            logger.error(f"Ошибка при получении данных страницы {worksheet_id}: {e}")
+        return None
+
+    def read_batch(self, ranges: list[tuple[int, Optional[str]]]) -> list[list[list[str]]]:
+        """
+        Получает данные сразу с нескольких страниц Google таблицы одним запросом `values:batchGet`
+        :param ranges: Список кортежей (идентификатор страницы, диапазон в формате A1 или None для всей страницы)
+            [(1, None), (1, 'K2:K'), ...]
+        :return: Список значений диапазонов в том же порядке, что и `ranges`. Каждое значение в виде списка списков.
+            Если запрос выполнить не удалось, то возвращается пустой список.
+        """
+        result = []
+        try:
+            self.open_workbook()
+            range_names = [
+                gspread.utils.absolute_range_name(self._worksheets[worksheet_id].title, range_name)
+                for worksheet_id, range_name in ranges
+            ]
+            response = self._flight.do(('batch', tuple(ranges)), self._call, self._wb.values_batch_get, range_names)
+            # Выравниваем строки по длине, как это делает get_all_values()
+            result = [
+                gspread.utils.fill_gaps(value_range.get('values', [[]]))
+                for value_range in response.get('valueRanges', [])
+            ]
+        except gspread.exceptions.APIError as e:
+            logger.error(f"Ошибка при пакетном получении данных страниц: {e}")
+        except Exception as e:
+            logger.error(f"Ошибка при пакетном получении данных страниц: {e}")
+        return result
+
+    def read_range(self, worksheet_id: int, range_name: str) -> list[list[str]]:
+        """
+        Получает данные диапазона страницы Google таблицы
+        :param worksheet_id: Идентификатор страницы
+        :param range_name: Диапазон в формате A1, например 'K2:K'
+        :return: List[List[str]]. Если запрос выполнить не удалось, то возвращается пустой список.
+        """
+        result = []
+        try:
+            self.open_workbook()
+            absolute_range = gspread.utils.absolute_range_name(self._worksheets[worksheet_id].title, range_name)
+            response = self._flight.do(('range', worksheet_id, range_name), self._call,
+                                       self._wb.values_get, absolute_range)
+            result = gspread.utils.fill_gaps(response.get('values', [[]]))
+        except gspread.exceptions.APIError as e:
+            logger.error(f"Ошибка при получении диапазона {range_name}: {e}")
+        except Exception as e:
+            logger.error(f"Ошибка при получении диапазона {range_name}: {e}")
+        return result
 
-    def save_cell(self, worksheet_id: int, row: int, col: int, value: str):
-        """Записываем данные в ячейку"""
+    def save_cell(self, worksheet_id: int, row: int, col: int, value: str) -> bool:
+        """
+        Записываем данные в ячейку
+        :return: True, если запись выполнена
+        """
         try:
-            sheet = self._gc.open_by_key(self.key_wb).get_worksheet(worksheet_id)
-            return sheet.update_cell(row, col, value)
+            sheet = self.get_worksheet(worksheet_id)
+            self._call(sheet.update_cell, row, col, value)
+            return True
 
         except gspread.exceptions.APIError as e:
-            logger.error(f"Ошибка при получении списка настроек: {e}")
+            logger.error(f"Ошибка при записи ячейки ({row}, {col}) страницы {worksheet_id}: {e}")
 
         except Exception as e:
-            logger.error(f"Ошибка при получении списка имён страниц: {e}")
+            logger.error(f"Ошибка при записи ячейки ({row}, {col}) страницы {worksheet_id}: {e}")
+        return False
+
+    def save_cells(self, worksheet_id: int, cells: dict[tuple[int, int], str]) -> bool:
+        """
+        Записываем данные в несколько ячеек одним запросом `values:batchUpdate`
+        :param worksheet_id: Идентификатор страницы
+        :param cells: Словарь {(номер строки, номер колонки): значение}
+        :return: True, если запись выполнена
+        """
+        try:
+            sheet = self.get_worksheet(worksheet_id)
+            data = [{'range': gspread.utils.rowcol_to_a1(row, col), 'values': [[value]]}
+                    for (row, col), value in cells.items()]
+            # Значения записываем так же, как update_cell, чтобы даты распознавались таблицей
+            self._call(sheet.batch_update, data, value_input_option=gspread.utils.ValueInputOption.user_entered)
+            return True
+
+        except gspread.exceptions.APIError as e:
+            logger.error(f"Ошибка при пакетной записи ячеек: {e}")
+
+        except Exception as e:
+            logger.error(f"Ошибка при пакетной записи ячеек: {e}")
+        return False
+
+
+class HeartbeatWriter:
+    """
+    Накопитель записей о последнем запуске задач.
+
+    Записи копятся в очереди и записываются в Google таблицу одним запросом, когда в очереди набирается
+    `max_size` строк или с момента первой записи в очереди проходит `max_delay` сек.
+    При завершении процесса оставшиеся записи записываются автоматически.
+    """
+    def __init__(self, rw_google: RWGoogle, worksheet_id: int = 1, col: int = 11,
+                 max_size: int = 100, max_delay: float = 10):
+        """
+        :param rw_google: Объект для записи в Google таблицу
+        :param worksheet_id: Идентификатор страницы задач
+        :param col: Номер колонки 'last_start'
+        :param max_size: Количество строк в очереди, при котором выполняется запись
+        :param max_delay: Максимальное время нахождения записи в очереди, сек
+        """
+        self._rw_google = rw_google
+        self._worksheet_id = worksheet_id
+        self._col = col
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self._queue: dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        atexit.register(self.flush)
+
+    def add(self, row: int, value: str) -> None:
+        """
+        Добавляем в очередь запись о последнем запуске задачи.
+        Повторная запись той же строки заменяет предыдущее значение в очереди.
+        :param row: Номер строки задачи
+        :param value: Значение даты последнего запуска в формате '%Y-%m-%d %H:%M:%S'
+        """
+        with self._lock:
+            self._queue[row] = value
+            flush_now = len(self._queue) >= self.max_size
+            if not flush_now and self._timer is None:
+                self._timer = threading.Timer(self.max_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if flush_now:
+            self.flush()
+
+    def flush(self) -> bool:
+        """
+        Записываем все записи очереди в Google таблицу одним запросом. Пустая очередь не записывается.
+        Если запись не удалась, то записи возвращаются в очередь, более новые значения не перезаписываются.
+        :return: True, если очередь пуста или запись выполнена
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            queue, self._queue = self._queue, {}
+        if not queue:
+            return True
+
+        cells = {(row, self._col): value for row, value in queue.items()}
+        if self._rw_google.save_cells(self._worksheet_id, cells):
+            logger.info(f"Записано время последнего запуска задач в строках: {sorted(queue)}")
+            return True
+
+        with self._lock:
+            self._queue = {**queue, **self._queue}
+        return False
 
 
 class WorkGoogle:
-    def __init__(self):
-        self._rw_google = RWGoogle()
+    # Страницы, которые читаются за один цикл мониторинга: настройки, задачи, получатели тревог
+    CYCLE_SHEETS = (0, 1, 5)
+    # Диапазоны колонок 'task_id' и 'last_start' на странице задач, которые читаются в каждом цикле
+    # инкрементального режима. По колонке 'task_id' проверяется, что строки страницы не сдвинулись
+    TASKS_ID_RANGE = 'A2:A'
+    TASKS_LAST_START_RANGE = 'K2:K'
+    # Период полного перечитывания страницы задач в инкрементальном режиме, сек
+    TASKS_STATIC_TTL = 600
+    # Страницы настроек и срок актуальности их сохранённых копий, сек:
+    # настройки, получатели уведомлений, параметры поставщиков, автоперезаказ, получатели тревог
+    CONFIG_SHEETS_TTL = {0: 600, 2: 300, 3: 600, 4: 600, 5: 300}
+    # Папка для сохранения копий страниц настроек на диске
+    CONFIG_CACHE_DIR = 'cache'
+
+    def __init__(self, key_wb: str = None, gc: gspread.Client = None, workbook: str = '',
+                 quota: TokenBucket = None):
+        """
+        :param key_wb: Идентификатор Google таблицы. По умолчанию основная таблица из настроек
+        :param gc: Авторизованный клиент Google API, общий для нескольких таблиц
+        :param workbook: Метка таблицы, которой помечаются её задачи и тревоги. Пустая строка для основной таблицы
+        :param quota: Лимит запросов к Google API. По умолчанию общий для всех таблиц `API_QUOTA`
+        """
+        self._rw_google = RWGoogle(key_wb, gc, quota)
+        self.workbook = workbook
+        self.heartbeat = HeartbeatWriter(self._rw_google)
         self.users_notif = []
+        # Индексы получателей уведомлений: (task_id, status_id, user_id или manager_id) -> список чатов
+        self._chat_id_by_user: dict[tuple[str, str, str], list[str]] = {}
+        self._chat_id_by_manager: dict[tuple[str, str, str], list[str]] = {}
+        self._cycle_sheets: dict[tuple[int, Optional[str]], list[list[str]]] = {}
+        self._tasks_static: list[list[str]] = []  # Строки страницы задач без заголовка из последнего полного чтения
+        self._tasks_static_time: Optional[float] = None
+        self._tasks_rows: dict[int, tuple[int, Task]] = {}  # Номер строки -> (хэш строки, преобразованная задача)
+        self.tasks_errors: list[dict] = []  # Строки страницы задач, которые не удалось преобразовать при чтении
+        # Задачи последнего чтения в массивах для проверки интервалов запуска, обновляются по изменившимся строкам
+        self.task_table = TaskTable(task_id_ignor=TASK_ID_IGNOR)
+        self._tasks_row_index: dict[str, int] = {}  # Идентификатор задачи -> номер строки
+        self._snapshots: dict[int, tuple[float, list[list[str]]]] = {}  # Страница -> (время получения, значения)
+        self._snapshots_refreshing: set[int] = set()
+        self._snapshots_lock = threading.Lock()
+
+    def start_cycle(self, incremental: bool = False) -> None:
+        """
+        Начинаем цикл мониторинга: сбрасываем счётчик обращений к API и получаем данные всех нужных
+        страниц одним запросом. До вызова `end_cycle` страницы читаются из полученных данных.
+        :param incremental: Инкрементальный режим. Со страницы задач получаем только колонки 'task_id'
+            и 'last_start', если полное чтение страницы выполнялось не раньше чем `TASKS_STATIC_TTL` сек назад.
+        """
+        self._rw_google.reset_api_calls()
+        tasks_ranges = [None]
+        if incremental and not self._tasks_static_expired():
+            tasks_ranges = [self.TASKS_ID_RANGE, self.TASKS_LAST_START_RANGE]
+        # Страницы настроек получаем, только если их сохранённые копии устарели
+        ranges = [(worksheet_id, range_name) for worksheet_id in self.CYCLE_SHEETS
+                  if worksheet_id not in self.CONFIG_SHEETS_TTL or self._snapshot_expired(worksheet_id)
+                  for range_name in (tasks_ranges if worksheet_id == 1 else [None])]
+        values = self._rw_google.read_batch(ranges)
+        self._cycle_sheets = dict(zip(ranges, values))
+        for (worksheet_id, range_name), sheet_values in self._cycle_sheets.items():
+            if worksheet_id in self.CONFIG_SHEETS_TTL:
+                self._save_snapshot(worksheet_id, sheet_values)
+
+    def refresh_auth(self) -> None:
+        """Обновляем токен доступа к Google API, если срок его действия истёк"""
+        self._rw_google.refresh_auth()
+
+    def end_cycle(self) -> int:
+        """
+        Завершаем цикл мониторинга и очищаем полученные за цикл данные страниц
+        :return: Количество обращений к Google API за цикл
+        """
+        self._cycle_sheets = {}
+        return self._rw_google.reset_api_calls()
+
+    def read_sheet(self, worksheet_id: int) -> Optional[list[list[str]]]:
+        """
+        Получаем значения страницы. Если страница уже получена в текущем цикле, то к API не обращаемся.
+        Страницы настроек читаются из сохранённых копий, см. `read_config_sheet`.
+        :param worksheet_id: Идентификатор страницы
+        :return: List[List[str]]. Если получить данные не удалось, то для страницы настроек возвращается
+            пустой список, а для остальных страниц None.
+        """
+        if (worksheet_id, None) in self._cycle_sheets:
+            return self._cycle_sheets[(worksheet_id, None)]
+        if worksheet_id in self.CONFIG_SHEETS_TTL:
+            return self.read_config_sheet(worksheet_id)
+        return self._rw_google.read_sheet(worksheet_id)
+
+    def _snapshot_path(self, worksheet_id: int) -> str:
+        """Путь к файлу с сохранённой копией страницы"""
+        return os.path.join(self.CONFIG_CACHE_DIR, f"{self._rw_google.key_wb}_{worksheet_id}.json")
+
+    def _get_snapshot(self, worksheet_id: int) -> Optional[tuple[float, list[list[str]]]]:
+        """
+        Получаем сохранённую копию страницы из памяти, а если её там нет, то с диска
+        :return: Кортеж (время получения, значения) или None, если копии нет
+        """
+        snapshot = self._snapshots.get(worksheet_id)
+        if snapshot is None:
+            try:
+                with open(self._snapshot_path(worksheet_id), encoding='utf-8') as f:
+                    data = json.load(f)
+                snapshot = self._snapshots[worksheet_id] = (data['time'], data['values'])
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.error(f"Ошибка при чтении сохранённой копии страницы {worksheet_id}: {e}")
+        return snapshot
+
+    def _save_snapshot(self, worksheet_id: int, values: list[list[str]]) -> None:
+        """Сохраняем копию страницы в памяти и на диске"""
+        snapshot = (time.time(), values)
+        self._snapshots[worksheet_id] = snapshot
+        try:
+            os.makedirs(self.CONFIG_CACHE_DIR, exist_ok=True)
+            path = self._snapshot_path(worksheet_id)
+            # Страница настроек содержит данные доступа к API: файл доступен только владельцу
+            with open(os.open(path + '.tmp', os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w',
+                      encoding='utf-8') as f:
+                json.dump({'time': snapshot[0], 'values': values}, f, ensure_ascii=False)
+            os.replace(path + '.tmp', path)
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении копии страницы {worksheet_id}: {e}")
+
+    def _snapshot_expired(self, worksheet_id: int) -> bool:
+        """Проверяем, что сохранённой копии страницы нет или срок её актуальности истёк"""
+        snapshot = self._get_snapshot(worksheet_id)
+        return snapshot is None or time.time() - snapshot[0] > self.CONFIG_SHEETS_TTL[worksheet_id]
+
+    def _refresh_snapshot(self, worksheet_id: int) -> bool:
+        """
+        Получаем страницу из Google таблицы и обновляем её сохранённую копию
+        :return: True, если копия обновлена
+        """
+        try:
+            values = self._rw_google.read_sheet(worksheet_id)
+            if values is not None:
+                self._save_snapshot(worksheet_id, values)
+            return values is not None
+        finally:
+            with self._snapshots_lock:
+                self._snapshots_refreshing.discard(worksheet_id)
+
+    def read_config_sheet(self, worksheet_id: int) -> list[list[str]]:
+        """
+        Получаем значения страницы настроек из сохранённой копии.
+        Если копия актуальна, то к API не обращаемся. Если срок актуальности истёк, то возвращаем копию
+        и обновляем её в фоновом потоке. Если копии нет, то получаем страницу из Google таблицы.
+        При ошибке API используется последняя успешно полученная копия.
+        :param worksheet_id: Идентификатор страницы настроек
+        :return: List[List[str]]. Если получить данные не удалось и копии нет, то возвращается пустой список.
+        """
+        snapshot = self._get_snapshot(worksheet_id)
+        if snapshot is None:
+            with self._snapshots_lock:
+                self._snapshots_refreshing.add(worksheet_id)
+            self._refresh_snapshot(worksheet_id)
+            snapshot = self._get_snapshot(worksheet_id)
+            return snapshot[1] if snapshot else []
+
+        if self._snapshot_expired(worksheet_id):
+            with self._snapshots_lock:
+                start_refresh = worksheet_id not in self._snapshots_refreshing
+                self._snapshots_refreshing.add(worksheet_id)
+            if start_refresh:
+                threading.Thread(target=self._refresh_snapshot, args=(worksheet_id,), daemon=True).start()
+        return snapshot[1]
+
+    def read_range(self, worksheet_id: int, range_name: str) -> list[list[str]]:
+        """
+        Получаем значения диапазона страницы. Если диапазон уже получен в текущем цикле, то к API не обращаемся.
+        :param worksheet_id: Идентификатор страницы
+        :param range_name: Диапазон в формате A1
+        :return: List[List[str]]
+        """
+        if (worksheet_id, range_name) in self._cycle_sheets:
+            return self._cycle_sheets[(worksheet_id, range_name)]
+        return self._rw_google.read_range(worksheet_id, range_name)
 
     def get_setting(self) -> dict:
         """
@@ -93,50 +646,124 @@ class WorkGoogle:
                 "work_close" - время окончания работы магазина (скрипта),
                 "api" - данные для доступа по API (на данный момент не передаются, но колонка есть)
         """
-        setting = self._rw_google.read_sheet(0)
+        setting = self.read_sheet(0)
         # values = self.read_sheet(AUTH_GOOGLE['KEY_WORKBOOK'], 0)
+        if len(setting) < 2:
+            logger.error("Не удалось получить настройки со страницы 0")
+            return {}
         params_head = ["work_open", "work_close", "auth_api"]
-        return dict(zip(params_head, setting[1:][0]))
+        return dict(zip(params_head, setting[1]))
 
-    def get_tasks(self) -> list[dict]:
+    def get_tasks(self, incremental: bool = False) -> Optional[list[Task]]:
         """
-        Получаем вторую строку с первой страницы и возвращаем их в словаре с предварительно заданными ключами
-        :return: dict
-            ключи словаря [
-            "task_id" - Номер события,
-            "task_name" - Наименование события
-            "time_start" - Время начала работы скрипта
-            "time_finish" - Время окончания работы скрипта
-            "task_interval" - Интервал запуска, сек
-            "status_name" - Наименование статуса позиции
-            "status_id" - Идентификатор статуса позиции
-            "date_start" - Дата с которой загружаем заказы
-            "repeat" - Требуется ли отправлять повторные уведомления
-            "retry_count" - Количество попыток оформления заказов поставщикам
-            "last_start" - последний старт задачи
-            "temp_not1" - Шаблон первичного уведомления
-            "temp_not2" - Шаблон повторного уведомления
-            "row_task_on_sheet" - Номер строки задачи на листе Google sheets
-            ]
+        Получаем задачи со второй страницы Google таблицы.
+        Строки, которые не изменились с предыдущего вызова, повторно не преобразуются, у их задач только
+        заново ограничивается 'date_start' по текущему времени.
+        Строки, которые не удалось преобразовать, пропускаются и сохраняются в `tasks_errors`.
+        Задачи записываются в `task_table`: если строки не добавлялись и не удалялись, то обновляются
+        только изменившиеся строки.
+        :param incremental: Инкрементальный режим. Страница задач читается полностью раз в `TASKS_STATIC_TTL` сек,
+            в остальных вызовах читается только колонка 'last_start'.
+        :return: list[Task]. Если получить страницу задач не удалось, то возвращается None,
+            а задачи предыдущего чтения остаются в `last_tasks`.
         """
-        params_head = [
-            "task_id", "task_name", "time_start", "time_finish", "task_interval", "status_name",
-            "status_id", "date_start", "repeat", "retry_count", "last_start", "temp_not1", "temp_not2"
-        ]
+        if incremental:
+            tasks = self.read_tasks_incremental()
+        else:
+            tasks = self.read_sheet(1)
+            tasks = tasks[1:] if tasks is not None else None
+        if tasks is None:
+            logger.error("Не удалось получить страницу задач")
+            return None
+
         tasks_list = []
+        tasks_rows = {}
+        changed = []  # Позиции в tasks_list задач, преобразованных заново
+        self.tasks_errors = []
+        utc_now = dt.datetime.utcnow()
         i = 2  # Первоначальный Номер строки считываемой задачи
-        tasks = self._rw_google.read_sheet(1)
-        for val in tasks[1:]:
-            params_tasks = dict(zip(params_head, val))
-            params_tasks = self.convert_value(params_tasks)
-            params_tasks['row_task_on_sheet'] = i
-            tasks_list += [params_tasks]
+        for val in tasks:
+            # Строку преобразуем, только если она изменилась с предыдущего вызова
+            row_hash = hash(tuple(val))
+            row_cached = self._tasks_rows.get(i)
+            if row_cached and row_cached[0] == row_hash:
+                task = row_cached[1]
+                date_start = clip_date_start(task.date_start, utc_now)
+                if date_start != task.date_start:
+                    task = dataclasses.replace(task, date_start=date_start)
+                    changed += [len(tasks_list)]
+            else:
+                try:
+                    task = parse_task_row(val, i, utc_now, self.workbook)
+                except ValueError as e:
+                    self.tasks_errors += [{'row_task_on_sheet': i, 'values': val, 'error': str(e)}]
+                    i += 1
+                    continue
+                changed += [len(tasks_list)]
+            tasks_rows[i] = (row_hash, task)
+            tasks_list += [task]
             i += 1
+        if self.tasks_errors:
+            logger.error(f"Не удалось преобразовать строки задач: "
+                         f"{[(error['row_task_on_sheet'], error['error']) for error in self.tasks_errors]}")
+        self.task_table.update(tasks_list, changed if list(tasks_rows) == list(self._tasks_rows) else None)
+        self._tasks_rows = tasks_rows
+        self._tasks_row_index = {str(task.task_id): row for row, (_, task) in tasks_rows.items()}
         return tasks_list
 
+    @property
+    def last_tasks(self) -> list[Task]:
+        """Задачи, полученные последним успешным вызовом get_tasks()"""
+        return [task for _, task in self._tasks_rows.values()]
+
+    def _tasks_static_expired(self) -> bool:
+        """Проверяем, требуется ли полное чтение страницы задач в инкрементальном режиме"""
+        return (self._tasks_static_time is None
+                or time.monotonic() - self._tasks_static_time > self.TASKS_STATIC_TTL)
+
+    def read_tasks_incremental(self) -> Optional[list[list[str]]]:
+        """
+        Получаем строки страницы задач без заголовка.
+        Страница читается полностью раз в `TASKS_STATIC_TTL` сек, а также при появлении новых строк
+        или если колонка 'task_id' не совпадает с сохранёнными строками (строки удалены или переставлены).
+        В остальных случаях читается только колонка 'last_start' и подставляется в сохранённые строки.
+        :return: List[List[str]]. Если получить страницу не удалось, то возвращается None
+        """
+        if not self._tasks_static_expired():
+            last_start = self.read_range(1, self.TASKS_LAST_START_RANGE)
+            if last_start and len(last_start) <= len(self._tasks_static):
+                if self._tasks_ids_match(self.read_range(1, self.TASKS_ID_RANGE)):
+                    last_start += [[''] for _ in range(len(self._tasks_static) - len(last_start))]
+                    return [row[:10] + [value[0] if value else ''] + row[11:]
+                            for row, value in zip(self._tasks_static, last_start)]
+                logger.info("Строки страницы задач изменились. Читаем страницу полностью")
+
+        tasks = self.read_sheet(1)
+        if tasks is None:
+            return None
+        self._tasks_static = tasks[1:]
+        self._tasks_static_time = time.monotonic()
+        return self._tasks_static
+
+    def _tasks_ids_match(self, ids: list[list[str]]) -> bool:
+        """
+        Проверяем, что колонка 'task_id' совпадает с идентификаторами задач сохранённых строк
+        :param ids: Значения диапазона `TASKS_ID_RANGE`
+        :return: True, если строки задач на странице не сдвинулись
+        """
+        ids = [row[0] if row else '' for row in ids]
+        ids_static = [row[0] if row else '' for row in self._tasks_static]
+        # Пустые строки в конце страницы API не возвращает
+        while ids and not ids[-1]:
+            ids.pop()
+        while ids_static and not ids_static[-1]:
+            ids_static.pop()
+        return ids == ids_static
+
     def get_users_notif(self):
         """
-        Получаем весь список пользователей по уведомлениям
+        Получаем весь список пользователей по уведомлениям и строим индексы для поиска чатов получателей.
+        Список и индексы при каждом вызове строятся заново и заменяют предыдущие целиком.
         :return: list[dict]
             Возвращается список словарей с данными получателей уведомлений
             [{"task_id" - Идентификатор уведомления,
@@ -147,28 +774,45 @@ class WorkGoogle:
             'tel_chat_id': Идентификатор чата для отправки уведомления (бот должен быть в этом чате)},
             ...,]
         """
-        list_users_notif = self._rw_google.read_sheet(2)
+        list_users_notif = self.read_sheet(2)
         params_head = ["task_id", "status_id", "user_name", "user_id", "manager_id", "tel_chat_id", "reorder_auto"]
+        users_notif = []
+        chat_id_by_user = {}
+        chat_id_by_manager = {}
         for val in list_users_notif[1:]:
             params_user_notif = dict(zip(params_head, val))
-            self.users_notif += [params_user_notif]
+            users_notif += [params_user_notif]
+            chats_id = params_user_notif.get('tel_chat_id', '').replace(' ', '').split(',')
+            task_id = params_user_notif.get('task_id', '')
+            status_id = params_user_notif.get('status_id', '')
+            # При повторе ключа используется первая строка, как при поиске перебором
+            chat_id_by_user.setdefault((task_id, status_id, params_user_notif.get('user_id', '')), chats_id)
+            chat_id_by_manager.setdefault((task_id, status_id, params_user_notif.get('manager_id', '')), chats_id)
+        self.users_notif = users_notif
+        self._chat_id_by_user = chat_id_by_user
+        self._chat_id_by_manager = chat_id_by_manager
 
     def get_chat_id_notif(self, task_id: str, status_id: str, search_id: str, type_search: str = 'user') -> list:
         """
-        Получаем список идентификаторов чатов телеграмм
-        :return: list[str]
+        Получаем список идентификаторов чатов телеграмм по индексам, построенным в `get_users_notif`
+        :param task_id: Идентификатор уведомления
+        :param status_id: Идентификатор статуса
+        :param search_id: Идентификатор пользователя или менеджера на платформе ABCP
+        :param type_search: 'user' - поиск по user_id, иначе по manager_id
+        :return: list[str]. Если получатель не найден, то возвращается пустой список.
         """
         task_id = task_id or '1'
         status_id = status_id or '144931'
 
-        type_id = 'user_id' if type_search == 'user' else 'manager_id'
-
-        user_notif = [v for v in self.users_notif if
-                      v['task_id'] == task_id and v['status_id'] == status_id and v[type_id] == search_id]
+        index = self._chat_id_by_user if type_search == 'user' else self._chat_id_by_manager
+        chats_id = index.get((task_id, status_id, search_id))
+        if chats_id is None:
+            logger.warning(f"Не найден получатель уведомления по задаче {task_id}, статусу {status_id}, "
+                           f"{type_search} {search_id}")
+            return []
 
-        logger.info(user_notif[0]['tel_chat_id'])
-        chats_id = user_notif[0]['tel_chat_id'].replace(' ', '').split(',')
-        return chats_id
+        logger.info(chats_id)
+        return list(chats_id)
 
     def users_alert_notif(self) -> list:
         """
@@ -177,7 +821,7 @@ class WorkGoogle:
             Возвращается список словарей с данными получателей уведомлений
             [{'tel_chat_id': Идентификатор чата для отправки уведомления (бот должен быть в этом чате)}]
         """
-        list_users_notif = self._rw_google.read_sheet(5)
+        list_users_notif = self.read_sheet(5)
         users_notif_alert = []
         params_head = ["tel_chat_id"]
         for val in list_users_notif[1:]:
@@ -197,7 +841,7 @@ class WorkGoogle:
             ]
         """
         suppliers_params = []
-        sheet_suppliers_setting = self._rw_google.read_sheet(3)
+        sheet_suppliers_setting = self.read_sheet(3)
         params_head = ["supplier_id", "supplier_name", "reorder_auto"]
         date_now = dt.datetime.now().strftime('%Y-%m-%d')
         for val in sheet_suppliers_setting[1:]:
@@ -222,7 +866,7 @@ class WorkGoogle:
             if 'shipmentDateDelivery' in row['params']['orderParams']:
                 row['params']['orderParams']['shipmentDateDelivery'] = date_now
 
-            row['reorder_auto'] = self.convert_yes_no_to_bool(str(row['reorder_auto']))
+            row['reorder_auto'] = parse_yes_no(str(row['reorder_auto']))
 
             suppliers_params += [row]
         return suppliers_params
@@ -239,12 +883,12 @@ class WorkGoogle:
             ]
         """
         users_reorder_auto = []
-        sheet_users_reorder_auto = self._rw_google.read_sheet(4)
+        sheet_users_reorder_auto = self.read_sheet(4)
         params_head = ["user_id", "manager_id", "user_name", "user_reorder_auto"]
 
         for val in sheet_users_reorder_auto[1:]:
             row = dict(zip(params_head, val))
-            row['user_reorder_auto'] = self.convert_yes_no_to_bool(str(row['user_reorder_auto']))
+            row['user_reorder_auto'] = parse_yes_no(str(row['user_reorder_auto']))
             users_reorder_auto += [row]
         return users_reorder_auto
 
@@ -255,63 +899,51 @@ class WorkGoogle:
         """
         self._rw_google.save_cell(1, row, 11, value)
 
-    @staticmethod
-    def convert_date(date: str) -> datetime.datetime:
+    def find_task_row(self, task_id: str) -> Optional[int]:
         """
-        Преобразуем дату полученной из Google таблицы в необходимый формат
-        Если дата больше года, то берем заказы за последние 364 дня.
-        :param date: Строка с датой в формате '%d.%m.%Y'
-        :return: Дата в формате datetime.datetime(2023, 11, 1, 0, 0)
+        Находим номер строки задачи на странице задач по её идентификатору.
+        Используются задачи, полученные последним вызовом get_tasks(). Если задачи ещё не получены, то читаем
+        только колонку 'task_id' без чтения и преобразования всей страницы задач.
+        :param task_id: Идентификатор задачи
+        :return: Номер строки или None, если задача не найдена
         """
-        date_start = dt.datetime.strptime(date, '%d.%m.%Y')
-        if (dt.datetime.utcnow() - date_start).days > 365:
-            date_start = dt.datetime.utcnow() - dt.timedelta(days=364)
-        return date_start
-
-    @staticmethod
-    def convert_time(time: str) -> datetime.time:
+        if not self._tasks_row_index:
+            ids = self.read_range(1, self.TASKS_ID_RANGE)
+            self._tasks_row_index = {row[0]: i for i, row in enumerate(ids, start=2) if row and row[0]}
+        row = self._tasks_row_index.get(str(task_id))
+        if row is None:
+            logger.error(f"Не найдена задача {task_id} на странице задач")
+        return row
+
+    def queue_last_start(self, value: str, row: int = None, task_id: str = None) -> None:
         """
-        Преобразуем время полученное из Google таблицы в необходимый формат
-        :param time: Строка с датой в формате '%H-%M'
-        :return: Дата в формате datetime.time(HH, MM)
+        Добавляем запись о последнем запуске задачи в очередь пакетной записи.
+        Строка задачи задаётся номером `row` или идентификатором задачи `task_id`.
+        :param value: Значение даты последнего запуска в формате '%Y-%m-%d %H:%M:%S'
+        :param row: Номер строки задачи
+        :param task_id: Идентификатор задачи
         """
-        return datetime.datetime.strptime(time, '%H-%M').time()
+        row = row or self.find_task_row(task_id)
+        if row:
+            self.heartbeat.add(row, value)
 
-    @staticmethod
-    def convert_date_time(date_time: str) -> datetime.datetime:
+    def flush_last_start(self) -> bool:
         """
-        Преобразуем время полученное из Google таблицы в необходимый формат
-        :param date_time: Строка с датой в формате '%Y-%m-%d %H:%M:%S'
-        :return: Дата в формате datetime.datetime(2023, 11, 1, 0, 0, 0)
+        Записываем накопленные записи о последнем запуске задач в Google таблицу одним запросом
+        :return: True, если запись выполнена или записывать нечего
         """
-        return datetime.datetime.strptime(date_time, '%Y-%m-%d %H:%M:%S')
+        return self.heartbeat.flush()
 
-    @staticmethod
-    def convert_yes_no_to_bool(value: str) -> bool:
-        """
-        Преобразуем значения
-        Если дата больше года, то берем заказы за последние 364 дня.
-        :param value: Строка со значением повтора уведомления. Допустимые значения: "да" или "нет"
-        :return: bool
-        """
-        value = value.lower()
-        return True if value == "да" else False if value == "нет" else None
-
-    def convert_value(self, dict_params: dict) -> dict:
-        """
-        Преобразовывает значения словаря полученной задачи 'date_start', 'last_start', 'time_start', 'time_finish' и
-        'repeat' в нужный формат
-        'date_start' -> datetime.datetime
-        'last_start' -> datetime.datetime
-        'time_start' -> datetime.time
-        'time_finish -> datetime.time
-        'repeat' -> bool
-        :param dict_params: Словарь с ключами 'date_start', 'last_start', 'time_start', 'time_finish' и 'repeat'
-        :return: Преобразованный словарь
-        """
-        dict_params['date_start'] = self.convert_date(dict_params['date_start'])
-        dict_params['last_start'] = self.convert_date_time(dict_params['last_start'])
-        dict_params['time_start'] = self.convert_time(dict_params['time_start'])
-        dict_params['time_finish'] = self.convert_time(dict_params['time_finish'])
-        dict_params['repeat'] = self.convert_yes_no_to_bool(dict_params['repeat'])
-        return dict_params
+
+def open_workbooks(keys: list[str] = None, gc: gspread.Client = None, quota: TokenBucket = None) -> list[WorkGoogle]:
+    """
+    Создаём объекты для работы с несколькими Google таблицами с одним общим авторизованным клиентом.
+    Задачи и тревоги основной (первой) таблицы не помечаются, остальных - помечаются идентификатором таблицы.
+    :param keys: Идентификаторы Google таблиц. По умолчанию таблицы из настроек
+    :param gc: Клиент Google API, например имитация для нагрузочных проверок. По умолчанию создаётся новый
+    :param quota: Лимит запросов к Google API. По умолчанию общий для всех таблиц `API_QUOTA`
+    :return: list[WorkGoogle] в порядке `keys`
+    """
+    keys = keys or workbook_keys()
+    gc = gc or authorize_client()
+    return [WorkGoogle(key, gc, workbook=key if i else '', quota=quota) for i, key in enumerate(keys)]
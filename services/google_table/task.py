@@ -0,0 +1,151 @@
+import datetime as dt
+from dataclasses import dataclass
+from typing import Optional
+
+# Количество колонок задачи на странице задач Google таблицы
+TASK_COLUMNS = 13
+
+
+@dataclass
+class Task:
+    """
+    Задача со страницы задач Google таблицы
+    task_id - Номер события
+    task_name - Наименование события
+    time_start - Время начала работы скрипта
+    time_finish - Время окончания работы скрипта
+    task_interval - Интервал запуска, сек
+    status_name - Наименование статуса позиции
+    status_id - Идентификатор статуса позиции
+    date_start - Дата с которой загружаем заказы
+    repeat - Требуется ли отправлять повторные уведомления
+    retry_count - Количество попыток оформления заказов поставщикам
+    last_start - последний старт задачи
+    temp_not1 - Шаблон первичного уведомления
+    temp_not2 - Шаблон повторного уведомления
+    row_task_on_sheet - Номер строки задачи на листе Google sheets
+    workbook - Метка Google таблицы, из которой получена задача. Пустая строка для основной таблицы
+    """
+    __slots__ = (
+        'task_id', 'task_name', 'time_start', 'time_finish', 'task_interval', 'status_name', 'status_id',
+        'date_start', 'repeat', 'retry_count', 'last_start', 'temp_not1', 'temp_not2', 'row_task_on_sheet',
+        'workbook'
+    )
+    task_id: str
+    task_name: str
+    time_start: dt.time
+    time_finish: dt.time
+    task_interval: int
+    status_name: str
+    status_id: str
+    date_start: dt.datetime
+    repeat: Optional[bool]
+    retry_count: str
+    last_start: dt.datetime
+    temp_not1: str
+    temp_not2: str
+    row_task_on_sheet: int
+    workbook: str
+
+    @property
+    def key(self) -> str:
+        """Ключ задачи, уникальный среди задач всех контролируемых Google таблиц"""
+        return task_key(self.task_id, self.workbook)
+
+
+def task_key(task_id: str, workbook: str = '') -> str:
+    """
+    Ключ задачи: идентификатор задачи для основной таблицы или '<метка таблицы>:<идентификатор задачи>'
+    для дополнительных таблиц
+    :param task_id: Идентификатор задачи
+    :param workbook: Метка Google таблицы
+    :return: str
+    """
+    return f'{workbook}:{task_id}' if workbook else str(task_id)
+
+
+def parse_date(value: str, utc_now: dt.datetime) -> dt.datetime:
+    """
+    Преобразуем дату из формата '%d.%m.%Y'. Если дата больше года, то берем заказы за последние 364 дня.
+    :param value: Строка с датой
+    :param utc_now: Текущее время UTC, одно для всех строк
+    :return: datetime.datetime
+    """
+    if len(value) == 10 and value[2] == '.' and value[5] == '.':
+        date_start = dt.datetime(int(value[6:10]), int(value[3:5]), int(value[0:2]))
+    else:
+        date_start = dt.datetime.strptime(value, '%d.%m.%Y')
+    return clip_date_start(date_start, utc_now)
+
+
+def clip_date_start(date_start: dt.datetime, utc_now: dt.datetime) -> dt.datetime:
+    """
+    Ограничиваем дату начала загрузки заказов: если дата больше года, то берем заказы за последние 364 дня
+    :param date_start: Дата начала загрузки заказов
+    :param utc_now: Текущее время UTC
+    :return: datetime.datetime
+    """
+    if (utc_now - date_start).days > 365:
+        return utc_now - dt.timedelta(days=364)
+    return date_start
+
+
+def parse_date_time(value: str) -> dt.datetime:
+    """
+    Преобразуем дату и время из формата '%Y-%m-%d %H:%M:%S'
+    :param value: Строка с датой и временем
+    :return: datetime.datetime
+    """
+    if len(value) == 19 and value[10] == ' ':
+        return dt.datetime.fromisoformat(value)
+    return dt.datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+
+
+def parse_time(value: str) -> dt.time:
+    """
+    Преобразуем время из формата '%H-%M'
+    :param value: Строка со временем
+    :return: datetime.time
+    """
+    hour, minute = value.split('-')
+    return dt.time(int(hour), int(minute))
+
+
+def parse_yes_no(value: str) -> Optional[bool]:
+    """
+    Преобразуем значения "да" и "нет" в bool
+    :return: True, False или None для других значений
+    """
+    value = value.lower()
+    return True if value == "да" else False if value == "нет" else None
+
+
+def parse_task_row(row: list[str], row_number: int, utc_now: dt.datetime, workbook: str = '') -> Task:
+    """
+    Преобразуем строку страницы задач в задачу
+    :param row: Значения строки
+    :param row_number: Номер строки на странице
+    :param utc_now: Текущее время UTC, одно для всех строк
+    :param workbook: Метка Google таблицы
+    :return: Task
+    :raise ValueError: Если значения строки не удалось преобразовать
+    """
+    if len(row) < TASK_COLUMNS:
+        row = row + [''] * (TASK_COLUMNS - len(row))
+    return Task(
+        task_id=row[0],
+        task_name=row[1],
+        time_start=parse_time(row[2]),
+        time_finish=parse_time(row[3]),
+        task_interval=int(row[4]),
+        status_name=row[5],
+        status_id=row[6],
+        date_start=parse_date(row[7], utc_now),
+        repeat=parse_yes_no(row[8]),
+        retry_count=row[9],
+        last_start=parse_date_time(row[10]),
+        temp_not1=row[11],
+        temp_not2=row[12],
+        row_task_on_sheet=row_number,
+        workbook=workbook,
+    )
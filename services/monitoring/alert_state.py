@@ -0,0 +1,159 @@
+import datetime as dt
+import sqlite3
+from typing import Iterable, Optional
+
+from loguru import logger
+
+from services.google_table.task import Task, task_key
+
+ALERT_STATE_FILE = 'alert_state.db'
+# Интервал первого повторного уведомления, сек. Каждый следующий интервал увеличивается вдвое
+RENOTIFY_BASE = 600
+# Максимальный интервал между повторными уведомлениями, сек
+RENOTIFY_MAX = 6 * 60 * 60
+
+
+class AlertState:
+    """
+    Хранилище состояния тревог по задачам.
+
+    Для каждой просроченной задачи хранится время последнего запуска, при котором найдена тревога,
+    время первого обнаружения и последнего уведомления, количество отправленных уведомлений.
+    Позволяет не отправлять уведомление по одной и той же тревоге в каждом цикле проверки
+    и сообщить о восстановлении задачи, когда её время последнего запуска изменилось.
+    Задачи хранятся по ключу `Task.key`, поэтому задачи разных Google таблиц не смешиваются.
+
+    `filter_alerts` только отбирает тревоги для уведомления. Состояние по ним записывается вызовом
+    `mark_notified` после того, как уведомления добавлены в очередь отправки, поэтому тревога,
+    уведомление о которой не удалось поставить в очередь, будет отобрана снова в следующей проверке.
+    """
+    def __init__(self, path: str = ALERT_STATE_FILE, task_id_ignor: Iterable = ()):
+        """
+        :param path: Файл хранилища
+        :param task_id_ignor: Идентификаторы задач, которые не проверяются. Их состояние удаляется
+        """
+        self._task_id_ignor = set(task_id_ignor)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS alert_state ("
+            "task_id TEXT PRIMARY KEY, "
+            "task_name TEXT, "
+            "last_start TEXT, "
+            "first_seen TEXT, "
+            "last_notified TEXT, "
+            "count_notified INTEGER)"
+        )
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        """Количество задач с активной тревогой"""
+        return self._conn.execute("SELECT COUNT(*) FROM alert_state").fetchone()[0]
+
+    @staticmethod
+    def renotify_interval(count_notified: int) -> dt.timedelta:
+        """
+        Интервал до следующего повторного уведомления
+        :param count_notified: Количество уже отправленных уведомлений по тревоге
+        :return: datetime.timedelta
+        """
+        return dt.timedelta(seconds=min(RENOTIFY_BASE * 2 ** (count_notified - 1), RENOTIFY_MAX))
+
+    def _state(self) -> dict[str, tuple]:
+        """Состояние тревог: ключ задачи -> (task_name, last_start, first_seen, last_notified, count_notified)"""
+        return {row[0]: row[1:] for row in self._conn.execute(
+            "SELECT task_id, task_name, last_start, first_seen, last_notified, count_notified FROM alert_state")}
+
+    def filter_alerts(self, list_alert: list[dict], tasks: Optional[list[Task]] = None,
+                      now: dt.datetime = None) -> tuple[list[dict], list[dict]]:
+        """
+        Отбираем тревоги, по которым нужно отправить уведомление, и находим восстановившиеся задачи.
+        Уведомление отправляется по новой тревоге, а по уже известной - только если у задачи
+        установлен признак 'repeat' и прошёл интервал повторного уведомления.
+        Состояние отобранных тревог и восстановившихся задач не изменяется, см. `mark_notified`.
+        :param list_alert: Список тревог, полученный из check_time_interval()
+        :param tasks: Список всех задач. Если передан, то задачи, время последнего запуска которых изменилось,
+            считаются восстановившимися, а состояние задач, которых нет в списке или которые не проверяются,
+            удаляется из хранилища
+        :param now: Текущий момент времени. По умолчанию datetime.datetime.now()
+        :return:
+            Кортеж (список тревог для уведомления, список восстановившихся задач).
+            Восстановившиеся задачи - словари с ключами:
+                'task_id': str or int,
+                'task_name': str,
+                'task_last_start': datetime.datetime(%Y, %m, %d, %H, %M, %S'),
+                'first_seen': datetime.datetime(%Y, %m, %d, %H, %M, %S'),
+                'workbook': str
+        """
+        now = now or dt.datetime.now()
+        state = self._state()
+
+        list_recovered = []
+        if tasks is not None:
+            self._remove_missing(state, tasks)
+            for task in tasks:
+                task_id = task.key
+                if task_id in state and task.last_start > dt.datetime.fromisoformat(state[task_id][1]):
+                    list_recovered += [{
+                        'task_id': task.task_id,
+                        'task_name': task.task_name,
+                        'task_last_start': task.last_start,
+                        'first_seen': dt.datetime.fromisoformat(state[task_id][2]),
+                        'workbook': task.workbook,
+                    }]
+                    state.pop(task_id)
+            if list_recovered:
+                logger.info(f"Задачи восстановились: {[task['task_id'] for task in list_recovered]}")
+
+        alert_notif = []
+        for alert in list_alert:
+            task_id = task_key(alert['task_id'], alert.get('workbook', ''))
+            row = state.get(task_id)
+            if row is None or row[1] != alert['task_last_start'].isoformat():
+                # Новая тревога
+                alert_notif += [alert]
+            elif alert.get('repeat') and now - dt.datetime.fromisoformat(row[3]) >= self.renotify_interval(row[4]):
+                alert_notif += [alert]
+            else:
+                logger.info(f"Повторное уведомление по задаче {task_id} не требуется")
+        return alert_notif, list_recovered
+
+    def _remove_missing(self, state: dict[str, tuple], tasks: list[Task]) -> None:
+        """Удаляем состояние задач, которых нет в списке задач или которые не проверяются"""
+        keys = {task.key for task in tasks if task.task_id not in self._task_id_ignor}
+        missing = [task_id for task_id in state if task_id not in keys]
+        if not missing:
+            return
+        self._conn.executemany("DELETE FROM alert_state WHERE task_id = ?", [(task_id,) for task_id in missing])
+        self._conn.commit()
+        for task_id in missing:
+            state.pop(task_id)
+        logger.info(f"Удалено состояние тревог задач, которые больше не проверяются: {missing}")
+
+    def mark_notified(self, list_alert: list[dict], list_recovered: list[dict] = (),
+                      now: dt.datetime = None) -> None:
+        """
+        Записываем состояние после того, как уведомления поставлены в очередь отправки:
+        по новым тревогам сохраняем время обнаружения, по повторным - увеличиваем количество уведомлений,
+        восстановившиеся задачи удаляем из хранилища.
+        :param list_alert: Тревоги, отобранные `filter_alerts`
+        :param list_recovered: Восстановившиеся задачи, найденные `filter_alerts`
+        :param now: Текущий момент времени. По умолчанию datetime.datetime.now()
+        """
+        now = now or dt.datetime.now()
+        state = self._state()
+        for task in list_recovered:
+            self._conn.execute("DELETE FROM alert_state WHERE task_id = ?",
+                               (task_key(task['task_id'], task.get('workbook', '')),))
+        for alert in list_alert:
+            task_id = task_key(alert['task_id'], alert.get('workbook', ''))
+            last_start = alert['task_last_start'].isoformat()
+            row = state.get(task_id)
+            if row is None or row[1] != last_start:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO alert_state VALUES (?, ?, ?, ?, ?, 1)",
+                    (task_id, alert['task_name'], last_start, now.isoformat(), now.isoformat()))
+            else:
+                self._conn.execute(
+                    "UPDATE alert_state SET last_notified = ?, count_notified = ? WHERE task_id = ?",
+                    (now.isoformat(), row[4] + 1, task_id))
+        self._conn.commit()
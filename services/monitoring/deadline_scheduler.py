@@ -0,0 +1,150 @@
+import datetime as dt
+import heapq
+import itertools
+from typing import Iterable, Optional
+
+from loguru import logger
+
+from services.google_table.task import Task
+
+# Погрешность на работу скрипта, добавляемая к началу рабочего времени задачи
+START_DELTA = dt.timedelta(seconds=20)
+
+
+class DeadlineScheduler:
+    """
+    Планировщик проверки задач по срокам.
+
+    Для каждой задачи вычисляется момент, начиная с которого она может считаться просроченной:
+    `last_start + 3 * task_interval`, но не раньше текущего времени, перенесённый на начало рабочего времени
+    задачи, если попадает вне его.
+    Сроки хранятся в очереди с приоритетом (min-heap), поэтому ближайший срок известен без перебора всех задач.
+    """
+    def __init__(self, task_id_ignor: Iterable = ()):
+        self._task_id_ignor = set(task_id_ignor)
+        self._heap: list[tuple[dt.datetime, int, str]] = []
+        self._counter = itertools.count()
+        self._entries: dict[str, int] = {}  # Ключ задачи -> номер актуальной записи в очереди
+        self._tasks: dict[str, Task] = {}
+        self._keys: dict[str, tuple] = {}  # Ключ задачи -> параметры задачи, по которым вычислен срок
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def task_key(task: Task) -> tuple:
+        """Параметры задачи, от которых зависит срок её проверки"""
+        return task.last_start, task.task_interval, task.time_start, task.time_finish
+
+    @staticmethod
+    def next_working_time(moment: dt.datetime, time_start: dt.time, time_finish: dt.time) -> dt.datetime:
+        """
+        Находим ближайший к `moment` момент (не раньше него), попадающий в рабочее время задачи
+        :param moment: Момент времени
+        :param time_start: Время начала работы задачи
+        :param time_finish: Время окончания работы задачи
+        :return: datetime.datetime
+        """
+        start_time = (dt.datetime.combine(dt.date(1, 1, 1), time_start) + START_DELTA).time()
+        time_moment = moment.time()
+        if start_time < time_finish:
+            if start_time <= time_moment <= time_finish:
+                return moment
+            day = moment.date() if time_moment < start_time else moment.date() + dt.timedelta(days=1)
+        else:
+            if time_moment <= time_finish or time_moment >= start_time:
+                return moment
+            day = moment.date()
+        return dt.datetime.combine(day, start_time)
+
+    def deadline(self, task: Task, now: dt.datetime = None) -> dt.datetime:
+        """
+        Вычисляем срок, после которого задача считается просроченной.
+        Срок уже просроченной задачи - текущий момент или начало её следующего рабочего времени.
+        :param task: Задача
+        :param now: Текущий момент времени. По умолчанию datetime.datetime.now()
+        :return: datetime.datetime
+        """
+        # Задача просрочена, когда с последнего запуска прошло больше трёх интервалов
+        overdue = task.last_start + dt.timedelta(seconds=task.task_interval * 3 + 1)
+        return self.next_working_time(max(overdue, now or dt.datetime.now()), task.time_start, task.time_finish)
+
+    def update(self, tasks: list[Task], now: dt.datetime = None) -> None:
+        """
+        Обновляем сроки задач по данным из Google таблицы.
+        Срок пересчитывается только для новых задач и задач, у которых изменились параметры запуска,
+        а также для задач, срок которых уже наступил. Задачи, которых больше нет в списке, удаляются.
+        :param tasks: Список задач, полученный из WorkGoogle.get_tasks()
+        :param now: Текущий момент времени. По умолчанию datetime.datetime.now()
+        """
+        now = now or dt.datetime.now()
+        task_ids = set()
+        for task in tasks:
+            if task.task_id not in self._task_id_ignor:
+                task_ids.add(task.key)
+                self.update_task(task, now)
+
+        for task_id in list(self._tasks):
+            if task_id not in task_ids:
+                self._tasks.pop(task_id)
+                self._keys.pop(task_id, None)
+                self._entries.pop(task_id, None)
+
+    def update_task(self, task: Task, now: dt.datetime = None) -> None:
+        """
+        Обновляем срок одной задачи. Срок пересчитывается, только если задачи нет в очереди
+        или изменились её параметры запуска.
+        :param task: Задача
+        :param now: Текущий момент времени. По умолчанию datetime.datetime.now()
+        """
+        task_id = task.key
+        self._tasks[task_id] = task
+        key = self.task_key(task)
+        if task_id in self._entries and self._keys.get(task_id) == key:
+            return
+        self._keys[task_id] = key
+        self._push(task_id, self.deadline(task, now))
+
+    def _push(self, task_id: str, deadline: dt.datetime) -> None:
+        """Добавляем срок задачи в очередь. Предыдущая запись задачи становится неактуальной"""
+        entry = next(self._counter)
+        self._entries[task_id] = entry
+        heapq.heappush(self._heap, (deadline, entry, task_id))
+
+    def _drop_stale(self) -> None:
+        """Удаляем из вершины очереди неактуальные записи"""
+        while self._heap and self._entries.get(self._heap[0][2]) != self._heap[0][1]:
+            heapq.heappop(self._heap)
+
+    def next_deadline(self) -> Optional[dt.datetime]:
+        """
+        Ближайший срок среди всех задач
+        :return: datetime.datetime или None, если задач нет
+        """
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: dt.datetime) -> list[Task]:
+        """
+        Получаем задачи, срок которых наступил к моменту `now`, и удаляем их из очереди.
+        Такие задачи снова попадут в очередь при следующем вызове `update`.
+        Задача, для которой сейчас не рабочее время, не возвращается, а остаётся в очереди со сроком
+        в начале её следующего рабочего времени.
+        :param now: Текущий момент времени
+        :return: Список задач
+        """
+        due = []
+        self._drop_stale()
+        while self._heap and self._heap[0][0] <= now:
+            _, _, task_id = heapq.heappop(self._heap)
+            task = self._tasks[task_id]
+            next_time = self.next_working_time(now, task.time_start, task.time_finish)
+            if next_time > now:
+                self._push(task_id, next_time)
+            else:
+                self._entries.pop(task_id)
+                due += [task]
+            self._drop_stale()
+        if due:
+            logger.info(f"Наступил срок проверки задач: {[task.key for task in due]}")
+        return due
@@ -0,0 +1,162 @@
+import datetime as dt
+import socket
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterable, Optional
+from urllib.parse import parse_qs, urlparse
+
+from loguru import logger
+
+# Максимальное количество задач в хранилище, пока ключи задач из Google таблиц ещё не получены
+MAX_TASKS = 10000
+
+
+class HeartbeatStore:
+    """
+    Хранилище времени последнего запуска задач, полученного от самих задач в обход Google таблицы.
+    Сохраняются только сигналы задач, ключи которых заданы `set_known`. Пока ключи не заданы,
+    сохраняется не больше `max_tasks` задач.
+    Методы потокобезопасны.
+    """
+    def __init__(self, max_tasks: int = MAX_TASKS):
+        self.max_tasks = max_tasks
+        self._last_start: dict[str, dt.datetime] = {}
+        self._updated: set[str] = set()
+        self._known: Optional[set[str]] = None
+        self._lock = threading.Lock()
+        self.count_beats = 0  # Количество полученных сигналов
+        self.count_rejected = 0  # Количество отклонённых сигналов неизвестных задач
+
+    def set_known(self, keys: Iterable[str]) -> None:
+        """
+        Задаём ключи задач контролируемых Google таблиц, см. `Task.key`.
+        Сохранённые сигналы других задач удаляются.
+        :param keys: Ключи задач
+        """
+        known = set(keys)
+        with self._lock:
+            self._known = known
+            unknown = [task_id for task_id in self._last_start if task_id not in known]
+            for task_id in unknown:
+                self._last_start.pop(task_id)
+                self._updated.discard(task_id)
+        if unknown:
+            logger.warning(f"Удалены сигналы о запуске неизвестных задач: {unknown[:10]}")
+
+    def beat(self, task_id: str, moment: dt.datetime = None) -> bool:
+        """
+        Отмечаем запуск задачи
+        :param task_id: Ключ задачи, см. `Task.key`
+        :param moment: Время запуска. По умолчанию текущее время
+        :return: True, если сигнал сохранён, False - если задача неизвестна
+        """
+        moment = moment or dt.datetime.now()
+        with self._lock:
+            self.count_beats += 1
+            if self._known is not None:
+                accepted = task_id in self._known
+            else:
+                accepted = task_id in self._last_start or len(self._last_start) < self.max_tasks
+            if not accepted:
+                self.count_rejected += 1
+                return False
+            self._last_start[task_id] = moment
+            self._updated.add(task_id)
+            return True
+
+    def get(self, task_id: str) -> Optional[dt.datetime]:
+        """Время последнего запуска задачи или None, если задача не отмечалась"""
+        return self._last_start.get(str(task_id))
+
+    def pop_updates(self) -> dict[str, dt.datetime]:
+        """
+        Получаем задачи, отмеченные с предыдущего вызова, для записи в Google таблицу
+        :return: Словарь {идентификатор задачи: время последнего запуска}
+        """
+        with self._lock:
+            updated, self._updated = self._updated, set()
+            return {task_id: self._last_start[task_id] for task_id in updated}
+
+
+class _UDPServer(socketserver.UDPServer):
+    # Увеличенный буфер приёма, чтобы не терять датаграммы при всплеске сигналов
+    receive_buffer_size = 4 * 1024 * 1024
+
+    def server_bind(self):
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.receive_buffer_size)
+        super().server_bind()
+
+
+class _UDPHandler(socketserver.BaseRequestHandler):
+    """Датаграмма содержит идентификатор задачи в кодировке UTF-8"""
+    def handle(self):
+        task_id = self.request[0].decode('utf-8').strip()
+        if task_id:
+            self.server.store.beat(task_id)
+
+
+class _HTTPHandler(BaseHTTPRequestHandler):
+    """Запрос вида GET или POST /heartbeat?task_id=<идентификатор задачи>"""
+    protocol_version = 'HTTP/1.1'
+
+    def _handle(self):
+        url = urlparse(self.path)
+        task_id = parse_qs(url.query).get('task_id', [''])[0]
+        if url.path != '/heartbeat' or not task_id:
+            self.send_response(400)
+        elif self.server.store.beat(task_id):
+            self.send_response(204)
+        else:
+            self.send_response(404)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    do_GET = _handle
+    do_POST = _handle
+
+    def log_message(self, format, *args):
+        pass
+
+
+class HeartbeatServer:
+    """
+    Приёмник сигналов о запуске задач по UDP и HTTP.
+    Задачи отправляют свой идентификатор, время запуска сохраняется в HeartbeatStore в памяти процесса.
+
+    Пример отправки из контролируемого скрипта:
+        socket.socket(socket.AF_INET, socket.SOCK_DGRAM).sendto(b'12', ('127.0.0.1', 8125))
+        requests.get('http://127.0.0.1:8125/heartbeat', params={'task_id': '12'})
+    """
+    def __init__(self, host: str = '127.0.0.1', port: int = 8125, store: HeartbeatStore = None):
+        self.store = store or HeartbeatStore()
+        self._udp = _UDPServer((host, port), _UDPHandler)
+        self._http = ThreadingHTTPServer((host, port), _HTTPHandler)
+        self._http.daemon_threads = True
+        self._udp.store = self._http.store = self.store
+        self._threads: list[threading.Thread] = []
+
+    @property
+    def udp_address(self) -> tuple[str, int]:
+        return self._udp.server_address
+
+    @property
+    def http_address(self) -> tuple[str, int]:
+        return self._http.server_address
+
+    def start(self) -> None:
+        """Запускаем приём сигналов в фоновых потоках"""
+        for server in (self._udp, self._http):
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            self._threads += [thread]
+        logger.info(f"Приём сигналов о запуске задач: UDP {self.udp_address}, HTTP {self.http_address}")
+
+    def stop(self) -> None:
+        """Останавливаем приём сигналов"""
+        for server in (self._udp, self._http):
+            server.shutdown()
+            server.server_close()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
@@ -0,0 +1,132 @@
+import datetime as dt
+from typing import Iterable, Optional
+
+import numpy as np
+
+from services.google_table.task import Task
+
+# Погрешность на работу скрипта, добавляемая к началу рабочего времени задачи, сек
+START_DELTA = 20
+SECONDS_IN_DAY = 24 * 60 * 60
+
+
+def time_to_seconds(time: dt.time) -> float:
+    """
+    Преобразуем время суток в количество секунд от начала суток
+    :param time: datetime.time
+    :return: float
+    """
+    return time.hour * 3600 + time.minute * 60 + time.second + time.microsecond / 1_000_000
+
+
+class TaskTable:
+    """
+    Компактное хранилище задач для проверки интервалов запуска.
+
+    Параметры задач, нужные для проверки, хранятся в массивах NumPy:
+    время последнего запуска в секундах эпохи, допустимый интервал, начало и окончание рабочего времени
+    в секундах от начала суток и признак пропуска задачи.
+    Проверка всех задач выполняется одной векторной операцией для одного значения текущего времени.
+    """
+    def __init__(self, tasks: list[Task] = None, task_id_ignor: Iterable = ()):
+        self._task_id_ignor = set(task_id_ignor)
+        self.update(tasks or [])
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    @property
+    def tasks(self) -> list[Task]:
+        """Задачи таблицы в порядке строк массивов"""
+        return self._tasks
+
+    def update(self, tasks: list[Task], changed: Optional[Iterable[int]] = None) -> None:
+        """
+        Заполняем массивы по списку задач.
+        Если переданы позиции изменившихся задач и количество задач не изменилось, то массивы не создаются заново,
+        а обновляются только эти позиции.
+        :param tasks: Список задач, полученный из WorkGoogle.get_tasks()
+        :param changed: Позиции в `tasks` задач, изменившихся с предыдущего вызова
+        """
+        if changed is not None and len(tasks) == len(self._tasks):
+            self.update_tasks({i: tasks[i] for i in changed})
+            return
+        self._tasks = list(tasks)
+        count = len(tasks)
+        self.last_start = np.fromiter((task.last_start.timestamp() for task in tasks), np.float64, count)
+        self.interval = np.fromiter((task.task_interval for task in tasks), np.int64, count)
+        self.time_start = np.fromiter(
+            ((time_to_seconds(task.time_start) + START_DELTA) % SECONDS_IN_DAY for task in tasks),
+            np.float64, count)
+        self.time_finish = np.fromiter((time_to_seconds(task.time_finish) for task in tasks), np.float64, count)
+        self.ignore = np.fromiter((task.task_id in self._task_id_ignor for task in tasks), np.bool_, count)
+
+    def update_tasks(self, tasks: dict[int, Task]) -> None:
+        """
+        Заменяем задачи в отдельных позициях без пересоздания массивов
+        :param tasks: Словарь {позиция задачи: новая задача}
+        """
+        for i, task in tasks.items():
+            self._tasks[i] = task
+            self.last_start[i] = task.last_start.timestamp()
+            self.interval[i] = task.task_interval
+            self.time_start[i] = (time_to_seconds(task.time_start) + START_DELTA) % SECONDS_IN_DAY
+            self.time_finish[i] = time_to_seconds(task.time_finish)
+            self.ignore[i] = task.task_id in self._task_id_ignor
+
+    def overdue_mask(self, now: dt.datetime) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Вычисляем маску просроченных задач, для которых сейчас рабочее время
+        :param now: Текущий момент времени
+        :return: Кортеж (маска просроченных задач, интервал с последнего запуска каждой задачи в секундах)
+        """
+        time_now = time_to_seconds(now.time())
+        task_delta_interval = (now.timestamp() - self.last_start).astype(np.int64)
+
+        # Рабочее время задачи может переходить через полночь
+        is_working_hours = np.where(
+            self.time_start < self.time_finish,
+            (self.time_start <= time_now) & (time_now <= self.time_finish),
+            (time_now <= self.time_finish) | (time_now >= self.time_start)
+        )
+        # Задача пропустила уже 3 допустимых интервала запуска и сейчас рабочее время этой задачи
+        mask = (task_delta_interval > self.interval * 3) & is_working_hours & ~self.ignore
+        return mask, task_delta_interval
+
+    def count_overdue(self, now: dt.datetime = None) -> int:
+        """
+        Количество просроченных задач, для которых сейчас рабочее время
+        :param now: Текущий момент времени. По умолчанию datetime.datetime.now()
+        :return: int
+        """
+        mask, _ = self.overdue_mask(now or dt.datetime.now())
+        return int(np.count_nonzero(mask))
+
+    def check_time_interval(self, now: dt.datetime = None) -> list[dict]:
+        """
+        Проверяем есть ли нарушения в интервале времени между запусками задач
+        :param now: Текущий момент времени. По умолчанию datetime.datetime.now()
+        :return:
+            Список словарей с ключами:
+                'task_id': str or int,
+                'task_name': str,
+                'task_last_start': datetime.datetime(%Y, %m, %d, %H, %M, %S'),
+                'time_interval': int,
+                'task_delta_interval': int,
+                'repeat': bool - требуется ли отправлять повторные уведомления,
+                'workbook': str - метка Google таблицы задачи,
+        """
+        mask, task_delta_interval = self.overdue_mask(now or dt.datetime.now())
+        alert = []
+        for i in np.flatnonzero(mask):
+            task = self._tasks[i]
+            alert += [{
+                'task_id': task.task_id,
+                'task_name': task.task_name,
+                'task_last_start': task.last_start,
+                'time_interval': int(self.interval[i]),
+                'task_delta_interval': int(task_delta_interval[i]),
+                'repeat': task.repeat,
+                'workbook': task.workbook,
+            }]
+        return alert
@@ -0,0 +1,249 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Callable, Optional
+
+from loguru import logger
+
+from services.common.metrics import METRICS
+from services.telegram.send_teleg import NotifTelegram
+
+ALERT_QUEUE_FILE = 'alert_queue.db'
+# Интервал первого повтора неудачной отправки, сек. Каждый следующий интервал увеличивается вдвое
+RETRY_BASE = 5
+# Максимальный интервал между повторами отправки, сек
+RETRY_MAX = 10 * 60
+# Время, после которого неотправленное сообщение удаляется из очереди как устаревшее, сек
+MESSAGE_MAX_AGE = 24 * 60 * 60
+# Время хранения отправленных сообщений, сек
+SENT_KEEP = 24 * 60 * 60
+# Максимальное количество сообщений, отправляемых за один проход обработчика очереди
+BATCH_SIZE = 200
+
+
+class AlertQueue:
+    """
+    Очередь исходящих уведомлений в телеграм в локальном файле SQLite (режим WAL).
+
+    Сообщение записывается в очередь для каждого чата отдельно и хранится до подтверждения отправки,
+    поэтому уведомление не теряется при ошибке отправки и при перезапуске программы.
+    Одинаковое сообщение в один чат, ещё не отправленное, повторно в очередь не добавляется.
+    Сообщения в каждый чат отправляются в порядке добавления: пока более раннее сообщение в чат ожидает
+    повтора отправки, следующие сообщения в этот чат не выдаются.
+    Доставка "хотя бы один раз": если программа завершится между отправкой и отметкой об отправке,
+    после перезапуска сообщение будет отправлено повторно.
+    Методы потокобезопасны: очередь пополняет цикл мониторинга, а разбирает AlertSender в своём потоке.
+    """
+    # Условие запроса: в тот же чат нет более раннего неотправленного сообщения, ожидающего повтора отправки
+    _NOT_BLOCKED = ("NOT EXISTS (SELECT 1 FROM outbox AS p WHERE p.chat_id = o.chat_id AND p.sent_at IS NULL "
+                    "AND p.id < o.id AND p.next_attempt > ?)")
+
+    def __init__(self, path: str = ALERT_QUEUE_FILE):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "dedupe_key TEXT, "
+            "chat_id TEXT, "
+            "text TEXT, "
+            "keyboard TEXT, "
+            "created REAL, "
+            "attempts INTEGER DEFAULT 0, "
+            "next_attempt REAL, "
+            "sent_at REAL, "
+            "last_error TEXT)"
+        )
+        # Уникальность только среди неотправленных сообщений: повторное уведомление по тревоге с тем же
+        # текстом после отправки предыдущего допускается
+        self._conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS outbox_pending ON outbox (dedupe_key) WHERE sent_at IS NULL")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS outbox_pending_chat ON outbox (chat_id, id) WHERE sent_at IS NULL")
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        """Количество неотправленных сообщений"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM outbox WHERE sent_at IS NULL").fetchone()[0]
+
+    @staticmethod
+    def dedupe_key(chat_id: str, message: dict) -> str:
+        """Ключ сообщения для исключения дублей: хэш чата, текста и клавиатуры"""
+        data = json.dumps([str(chat_id), message['text'], message.get('keyboard')], ensure_ascii=False)
+        return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+    def put(self, messages: list[dict], chats_id: list[str]) -> int:
+        """
+        Добавляем сообщения в очередь отправки во все чаты.
+        Порядок отправки сообщений в каждый чат совпадает с порядком списка `messages`.
+        :param messages: Список сообщений в формате результата `NotifTelegram.message_alert`
+        :param chats_id: Список идентификаторов чатов
+        :return: Количество добавленных сообщений без учёта дублей
+        """
+        now = time.time()
+        rows = [(self.dedupe_key(chat_id, message), str(chat_id), message['text'],
+                 json.dumps(message['keyboard']) if message.get('keyboard') else None, now, now)
+                for chat_id in chats_id for message in messages]
+        with self._lock:
+            count = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO outbox (dedupe_key, chat_id, text, keyboard, created, next_attempt) "
+                "VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+            count = self._conn.total_changes - count
+        METRICS.inc('alert_queue_enqueued_total', count)
+        if count < len(rows):
+            logger.info(f"Пропущено дублей сообщений, уже ожидающих отправки: {len(rows) - count}")
+        return count
+
+    def due(self, now: float = None, limit: int = BATCH_SIZE) -> list[tuple[int, str, dict]]:
+        """
+        Получаем сообщения, время отправки которых наступило, в порядке добавления в очередь.
+        Сообщение не выдаётся, если более раннее сообщение в тот же чат ещё ожидает повтора отправки.
+        :param now: Текущий момент времени time.time()
+        :param limit: Максимальное количество сообщений
+        :return: Список кортежей (идентификатор записи, идентификатор чата, сообщение)
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, chat_id, text, keyboard FROM outbox AS o "
+                f"WHERE sent_at IS NULL AND next_attempt <= ? AND {self._NOT_BLOCKED} "
+                "ORDER BY id LIMIT ?", (now, now, limit)).fetchall()
+        return [(row_id, chat_id, {'text': text, 'keyboard': json.loads(keyboard) if keyboard else None})
+                for row_id, chat_id, text, keyboard in rows]
+
+    def next_attempt(self, now: float = None) -> Optional[float]:
+        """
+        Ближайшее время отправки неотправленного сообщения time.time() или None, если очередь пуста.
+        Сообщения, ожидающие более раннего сообщения в тот же чат, не учитываются.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT MIN(next_attempt) FROM outbox AS o WHERE sent_at IS NULL AND {self._NOT_BLOCKED}",
+                (now,)).fetchone()[0]
+
+    def mark_sent(self, ids: list[int]) -> None:
+        """Отмечаем сообщения отправленными"""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany("UPDATE outbox SET sent_at = ? WHERE id = ?", [(now, row_id) for row_id in ids])
+            self._conn.commit()
+
+    def mark_failed(self, ids: list[int], error: str = '') -> None:
+        """
+        Откладываем повтор отправки сообщений.
+        Интервал до повтора увеличивается вдвое с каждой попыткой, но не больше RETRY_MAX.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE outbox SET attempts = attempts + 1, last_error = ?, "
+                "next_attempt = ? + MIN(? * (1 << MIN(attempts, 20)), ?) WHERE id = ?",
+                [(error, now, RETRY_BASE, RETRY_MAX, row_id) for row_id in ids])
+            self._conn.commit()
+
+    def purge(self, now: float = None) -> int:
+        """
+        Удаляем отправленные сообщения старше SENT_KEEP и неотправленные старше MESSAGE_MAX_AGE
+        :return: Количество удалённых неотправленных сообщений
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._conn.execute("DELETE FROM outbox WHERE sent_at < ?", (now - SENT_KEEP,))
+            expired = self._conn.execute(
+                "DELETE FROM outbox WHERE sent_at IS NULL AND created < ?", (now - MESSAGE_MAX_AGE,)).rowcount
+            self._conn.commit()
+        if expired:
+            logger.error(f"Удалены из очереди устаревшие неотправленные сообщения: {expired}")
+            METRICS.inc('alert_queue_expired_total', expired)
+        return expired
+
+
+class AlertSender:
+    """
+    Обработчик очереди уведомлений: отправляет в телеграм сообщения, время отправки которых наступило,
+    и откладывает повтор неотправленных. Работает в своём потоке, поэтому цикл мониторинга не ждёт отправки.
+    """
+    def __init__(self, queue: AlertQueue, telegram: Callable[[], NotifTelegram], poll_interval: float = 5):
+        """
+        :param queue: Очередь уведомлений
+        :param telegram: Функция, возвращающая клиент телеграм. Вызывается, только когда есть сообщения к отправке
+        :param poll_interval: Максимальный интервал проверки очереди, сек
+        """
+        self.queue = queue
+        self.telegram = telegram
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def process(self) -> int:
+        """
+        Отправляем сообщения из очереди, время отправки которых наступило
+        :return: Количество отправленных сообщений
+        """
+        self.queue.purge()
+        due = self.queue.due()
+        if not due:
+            return 0
+        messages_chats: dict[str, list[tuple[int, dict]]] = {}
+        for row_id, chat_id, message in due:
+            messages_chats.setdefault(chat_id, []).append((row_id, message))
+
+        results = self.telegram().send_chats(
+            {chat_id: [message for _, message in rows] for chat_id, rows in messages_chats.items()})
+        sent, failed, deferred = [], [], 0
+        for chat_id, rows in messages_chats.items():
+            for (row_id, _), result in zip(rows, results[chat_id]):
+                if result is None:
+                    # Не отправлялось после неудачи в этот чат: остаётся в очереди за неотправленным сообщением
+                    deferred += 1
+                else:
+                    (sent if result else failed).append(row_id)
+        self.queue.mark_sent(sent)
+        if failed:
+            self.queue.mark_failed(failed, 'sendMessage')
+            logger.warning(f"Не доставлено сообщений: {len(failed)}, отложено: {deferred}. Отправка будет повторена")
+        METRICS.set('alert_queue_pending', len(self.queue))
+        return len(sent)
+
+    def wake(self) -> None:
+        """Проверяем очередь сразу, не дожидаясь интервала проверки"""
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.clear()
+            timeout = self.poll_interval
+            try:
+                self.process()
+                next_attempt = self.queue.next_attempt()
+                if next_attempt is not None:
+                    timeout = min(timeout, max(next_attempt - time.time(), 0))
+            except Exception as e:
+                logger.error(f"Ошибка при отправке уведомлений из очереди: {e}")
+            self._wake.wait(timeout)
+
+    def start(self) -> None:
+        """Запускаем обработку очереди в фоновом потоке"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='alert-sender', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 30) -> None:
+        """
+        Останавливаем фоновый поток после текущего прохода.
+        Неотправленные сообщения остаются в очереди и будут отправлены после перезапуска.
+        """
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
@@ -1,20 +1,85 @@
-import telepot
-from telepot.namedtuple import InlineKeyboardMarkup, InlineKeyboardButton
+import json
+import threading
+from typing import TYPE_CHECKING, Optional
+
 from config import TOKEN_BOT
 from loguru import logger
-import time
+from services.common.metrics import METRICS
+from services.common.token_bucket import TokenBucket
+
+if TYPE_CHECKING:
+    import asyncio
+    import aiohttp
 
 """
 Ссылка на документацию по html форматированию сообщения в телеграмм
 https://core.telegram.org/bots/api#html-style
+Ограничения на частоту отправки сообщений
+https://core.telegram.org/bots/faq#my-bot-is-hitting-limits-how-do-i-avoid-this
 """
 
+API_URL = 'https://api.telegram.org'
+# Не более 30 сообщений в секунду для бота
+GLOBAL_RATE, GLOBAL_CAPACITY = 30, 30
+# Не более 1 сообщения в секунду в личный чат
+PRIVATE_CHAT_RATE, PRIVATE_CHAT_CAPACITY = 1, 1
+# Не более 20 сообщений в минуту в группу (за любую минуту: 5 подряд + 15 с пополнением)
+GROUP_CHAT_RATE, GROUP_CHAT_CAPACITY = 15 / 60, 5
+# Количество попыток отправки сообщения при превышении лимита (ответ 429)
+SEND_ATTEMPTS = 3
+REQUEST_TIMEOUT = 10
+# Максимальное количество одновременных запросов при параллельной отправке
+SEND_CONCURRENCY = 10
+# Максимальная длина текста сообщения в телеграм
+MESSAGE_MAX_LENGTH = 4096
+# Количество тревог за цикл, начиная с которого они объединяются в сводку
+DIGEST_THRESHOLD = 3
+
+
+class TelegramError(Exception):
+    """Сообщение не отправлено: ошибка Bot API или исчерпаны попытки отправки"""
+
 
 class NotifTelegram:
-    def __init__(self):
+    """
+    Клиент Bot API для отправки уведомлений.
+    Сообщения отправляются асинхронно через одну HTTP сессию aiohttp, которая создаётся при первой отправке
+    и переиспользуется всеми следующими отправками, поэтому соединения с телеграм не открываются заново.
+    Сессия работает в собственном цикле событий клиента. Для её закрытия вызвать `close`.
+    """
+    def __init__(self, api_url: str = API_URL, digest_threshold: int = DIGEST_THRESHOLD):
+        """
+        :param api_url: Адрес Bot API. Можно заменить на адрес локального сервера для проверок
+        :param digest_threshold: Количество тревог, начиная с которого они отправляются сводкой.
+            0 - сводка не используется
+        """
         self.TOKEN = TOKEN_BOT
+        self.digest_threshold = digest_threshold
         self.message = dict.fromkeys(['text', 'keyboard'])
         self.count_msg = 0
+        self._url_send = f"{api_url}/bot{self.TOKEN}/sendMessage"
+        self._global_bucket = TokenBucket(GLOBAL_RATE, GLOBAL_CAPACITY)
+        self._chat_buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        # Цикл событий и HTTP сессия, общие для всех отправок. Отправки из разных потоков выполняются по очереди
+        self._loop: Optional['asyncio.AbstractEventLoop'] = None
+        self._session: Optional['aiohttp.ClientSession'] = None
+        self._send_lock = threading.Lock()
+
+    def chat_bucket(self, chat_id: str) -> TokenBucket:
+        """
+        Получаем ограничитель частоты отправки для чата.
+        Идентификаторы групп в телеграм отрицательные, для них действует отдельный лимит.
+        :param chat_id: Идентификатор чата
+        :return: TokenBucket
+        """
+        with self._lock:
+            if chat_id not in self._chat_buckets:
+                if str(chat_id).startswith('-'):
+                    self._chat_buckets[chat_id] = TokenBucket(GROUP_CHAT_RATE, GROUP_CHAT_CAPACITY)
+                else:
+                    self._chat_buckets[chat_id] = TokenBucket(PRIVATE_CHAT_RATE, PRIVATE_CHAT_CAPACITY)
+            return self._chat_buckets[chat_id]
 
     def message_alert(self, task: dict):
         """
@@ -25,7 +90,8 @@ class NotifTelegram:
                 'task_name': str,
                 'task_last_start': datetime.datetime(%Y, %m, %d, %H, %M, %S'),
                 'time_interval': int,
-                'task_delta_interval': int
+                'task_delta_interval': int,
+                'workbook': str - метка Google таблицы, выводится, если не пустая
         return: dict {
             'text': текст сообщения: str
             'keyboard: клавиатура к сообщению: str'
@@ -37,32 +103,226 @@ class NotifTelegram:
         row4 = f'Последний запуск модуля: <code>{task["task_last_start"]}</code>\n'
         row5 = f'Интервал между запусками (сек): <code>{task["task_delta_interval"]}</code>\n'
         row6 = f'<b>Допустимый интервал между запусками (сек):</b> <code>{task["time_interval"]}</code>\n'
-        self.message['text'] = row1 + row2 + row3 + row4 + row5 + row6
+        self.message['text'] = row1 + row2 + row3 + row4 + row5 + row6 + self.message_workbook(task)
 
         # Создаём клавиатуру для сообщения
-        # self.message['keyboard'] = InlineKeyboardMarkup(inline_keyboard=[
-        #     [InlineKeyboardButton(text="Перейти к заказу", url=url_order)],
-        # ])
+        # self.message['keyboard'] = {'inline_keyboard': [
+        #     [{'text': "Перейти к заказу", 'url': url_order}],
+        # ]}
+        return dict(self.message)
+
+    @staticmethod
+    def message_recovered(task: dict) -> dict:
+        """
+        Формируем сообщение о восстановлении работы модуля после тревоги
+        :param task:
+            Словарь с ключами:
+                'task_name': str,
+                'task_last_start': datetime.datetime(%Y, %m, %d, %H, %M, %S'),
+                'first_seen': datetime.datetime(%Y, %m, %d, %H, %M, %S'),
+                'workbook': str
+        :return: dict {'text': текст сообщения, 'keyboard': клавиатура к сообщению}
+        """
+        row1 = "✅<b>                    ВОССТАНОВЛЕНО                       </b>✅\n\n"
+        row2 = "Модуль снова запускается:\n"
+        row3 = f'<code>{task["task_name"]}</code>\n'
+        row4 = f'Последний запуск модуля: <code>{task["task_last_start"]:%Y-%m-%d %H:%M:%S}</code>\n'
+        row5 = f'Тревога обнаружена: <code>{task["first_seen"]:%Y-%m-%d %H:%M:%S}</code>\n'
+        return {'text': row1 + row2 + row3 + row4 + row5 + NotifTelegram.message_workbook(task), 'keyboard': None}
+
+    @staticmethod
+    def message_workbook(task: dict) -> str:
+        """Строка сообщения с меткой Google таблицы задачи или пустая строка для основной таблицы"""
+        return f'Таблица: <code>{task["workbook"]}</code>\n' if task.get('workbook') else ''
+
+    @staticmethod
+    def message_digest(tasks: list[dict]) -> list[dict]:
+        """
+        Формируем сводку по нескольким тревогам.
+        Сводка разбивается на сообщения не длиннее MESSAGE_MAX_LENGTH, описание одной тревоги не разрывается.
+        :param tasks: Список словарей тревог с ключами как у `message_alert`
+        :return: Список сообщений в формате результата `message_alert`
+        """
+        blocks = []
+        for task in tasks:
+            # Ограничиваем длину наименования, чтобы описание тревоги гарантированно поместилось в сообщение
+            row1 = f'<code>{task["task_name"][:1000]}</code>\n'
+            row2 = f'Последний запуск модуля: <code>{task["task_last_start"]}</code>\n'
+            row3 = (f'Интервал между запусками (сек): <code>{task["task_delta_interval"]}</code>'
+                    f' / <b>допустимый:</b> <code>{task["time_interval"]}</code>\n')
+            blocks += [row1 + row2 + row3 + NotifTelegram.message_workbook(task) + '\n']
+
+        header = "‼️<b>                    ТРЕВОГА                       </b>‼️\n\n"
+        header += f"Превышено время запуска модулей: {len(tasks)}\n"
+        part_header = "Часть {}/{}\n\n"
+        # Резервируем место под заголовок части с максимальной длиной номеров
+        max_length = MESSAGE_MAX_LENGTH - len(header) - len(part_header.format(len(blocks), len(blocks)))
+
+        parts = [[]]
+        length = 0
+        for block in blocks:
+            if parts[-1] and length + len(block) > max_length:
+                parts += [[]]
+                length = 0
+            parts[-1] += [block]
+            length += len(block)
+
+        return [{'text': header + part_header.format(i, len(parts)) + ''.join(part), 'keyboard': None}
+                for i, part in enumerate(parts, start=1)]
+
+    def messages_alert(self, tasks: list[dict]) -> list[dict]:
+        """
+        Формируем сообщения по тревогам цикла проверки.
+        Если тревог не меньше `digest_threshold`, то они объединяются в сводку, иначе на каждую тревогу
+        формируется отдельное сообщение.
+        :param tasks: Список словарей тревог с ключами как у `message_alert`
+        :return: Список сообщений в формате результата `message_alert`
+        """
+        if self.digest_threshold and len(tasks) >= self.digest_threshold:
+            return self.message_digest(tasks)
+        return [self.message_alert(task) for task in tasks]
+
+    @staticmethod
+    def _message_params(chat_id: str, message: dict) -> dict:
+        """Параметры запроса sendMessage для отправки сообщения в чат"""
+        params = {
+            'chat_id': chat_id,
+            'text': message['text'],
+            'parse_mode': "HTML",
+            'disable_web_page_preview': 'true',
+        }
+        if message['keyboard']:
+            params['reply_markup'] = json.dumps(message['keyboard'])
+        return params
+
+    def _retry_after(self, chat_id: str, status: int, result: dict) -> float:
+        """
+        Разбираем ответ на неудачную отправку сообщения.
+        Если превышен лимит, то приостанавливаем отправку в чат на указанное телеграм время.
+        :return: Время, через которое можно повторить отправку, сек
+        :raise TelegramError: Если отправку повторять не нужно
+        """
+        retry_after = result.get('parameters', {}).get('retry_after')
+        if status != 429 or retry_after is None:
+            raise TelegramError(f"{result.get('error_code')}: {result.get('description')}")
+
+        logger.warning(f"Превышен лимит отправки сообщений в телеграм. Повтор через {retry_after} сек...")
+        METRICS.inc('telegram_rate_limited_total')
+        self.chat_bucket(chat_id).pause(retry_after)
+        return retry_after
+
+    def _send_delay(self, chat_id: str) -> float:
+        """Время ожидания, сек, пока отправка в чат не будет разрешена лимитами чата и бота"""
+        return max(self.chat_bucket(chat_id).reserve(), self._global_bucket.reserve())
 
     def send_massage_chat(self, chat_id: str) -> bool:
-        """Отправляем полученное сообщение в чат бот"""
+        """Отправляем полученное сообщение `self.message` в чат бот"""
         logger.info(chat_id)
+        return self.send_chats({chat_id: [dict(self.message)]})[chat_id][0]
+
+    def send_messages(self, messages: list[dict], chats_id: list[str],
+                      concurrency: int = SEND_CONCURRENCY) -> dict[tuple[int, str], Optional[bool]]:
+        """
+        Отправляем все сообщения во все чаты параллельно.
+        В каждый чат сообщения отправляются по очереди в порядке списка `messages`,
+        разные чаты обрабатываются одновременно, но не более `concurrency` запросов сразу.
+        После первой неудачной отправки в чат следующие сообщения в этот чат не отправляются,
+        чтобы не нарушить их порядок.
+        :param messages: Список сообщений в формате результата `message_alert`
+        :param chats_id: Список идентификаторов чатов
+        :param concurrency: Максимальное количество одновременных запросов
+        :return: Результат отправки для каждой пары (номер сообщения в списке, идентификатор чата):
+            True - отправлено, False - отправить не удалось, None - не отправлялось после неудачи
+        """
+        results = self.send_chats({chat_id: messages for chat_id in chats_id}, concurrency)
+        return {(i, chat_id): result for chat_id, chat_results in results.items()
+                for i, result in enumerate(chat_results)}
+
+    def send_chats(self, messages_chats: dict[str, list[dict]],
+                   concurrency: int = SEND_CONCURRENCY) -> dict[str, list[Optional[bool]]]:
+        """
+        Отправляем в каждый чат свой список сообщений. Порядок отправки и ограничения такие же, как в `send_messages`
+        :param messages_chats: Словарь {идентификатор чата: список сообщений}
+        :param concurrency: Максимальное количество одновременных запросов
+        :return: Словарь {идентификатор чата: результат отправки каждого сообщения}, значения как в `send_messages`
+        """
+        # asyncio и aiohttp импортируются только при отправке, чтобы не замедлять запуск программы без тревог
+        import asyncio
+
+        with self._send_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+            return self._loop.run_until_complete(self._send_chats_async(messages_chats, concurrency))
+
+    def close(self) -> None:
+        """Закрываем HTTP сессию и цикл событий. При следующей отправке они будут созданы заново"""
+        with self._send_lock:
+            if self._loop is None:
+                return
+            if self._session is not None:
+                self._loop.run_until_complete(self._session.close())
+                self._session = None
+            self._loop.close()
+            self._loop = None
+
+    def _get_session(self) -> 'aiohttp.ClientSession':
+        """HTTP сессия с пулом соединений, общая для всех отправок. Создаётся в цикле событий клиента"""
+        import aiohttp
+
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=SEND_CONCURRENCY),
+                                                  timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT))
+        return self._session
+
+    async def _send_chats_async(self, messages_chats: dict[str, list[dict]],
+                                concurrency: int) -> dict[str, list[Optional[bool]]]:
+        """Асинхронная отправка сообщений во все чаты"""
+        import asyncio
+
+        semaphore = asyncio.Semaphore(concurrency)
+        session = self._get_session()
+        results = await asyncio.gather(*[
+            self._send_chat_async(session, semaphore, messages, chat_id)
+            for chat_id, messages in messages_chats.items()
+        ])
+        return dict(zip(messages_chats, results))
+
+    async def _send_chat_async(self, session: 'aiohttp.ClientSession', semaphore: 'asyncio.Semaphore',
+                               messages: list[dict], chat_id: str) -> list[Optional[bool]]:
+        """
+        Отправляем сообщения в один чат по очереди, чтобы сохранить их порядок.
+        После первой неудачной отправки остальные сообщения не отправляются и получают результат None.
+        """
+        results = []
+        for message in messages:
+            result = await self._send_message_async(session, semaphore, message, chat_id)
+            results += [result]
+            if not result:
+                break
+        return results + [None] * (len(messages) - len(results))
+
+    async def _send_message_async(self, session: 'aiohttp.ClientSession', semaphore: 'asyncio.Semaphore',
+                                  message: dict, chat_id: str) -> bool:
+        """Асинхронно отправляем сообщение в чат с учётом лимитов телеграм"""
+        import asyncio
 
-        telegram_bot = telepot.Bot(self.TOKEN)
+        params = self._message_params(chat_id, message)
         try:
-            telegram_bot.sendMessage(
-                chat_id, self.message['text'],
-                parse_mode="HTML",
-                reply_markup=self.message['keyboard'],
-                disable_web_page_preview=True)
-
-            self.count_msg += 1
-            if self.count_msg == 19:
-                logger.warning(f"Отправлено {self.count_msg} сообщений в телеграм. Делаем паузу 60 сек...")
-                time.sleep(60)
-                self.count_msg = 0
-            return True
+            for _ in range(SEND_ATTEMPTS):
+                await asyncio.sleep(self._send_delay(chat_id))
+                async with semaphore:
+                    with METRICS.timer('telegram_request_seconds'):
+                        async with session.post(self._url_send, data=params) as response:
+                            status = response.status
+                            result = await response.json(content_type=None)
+                if result.get('ok'):
+                    self.count_msg += 1
+                    METRICS.inc('telegram_messages_total', result='sent')
+                    return True
+                self._retry_after(chat_id, status, result)
+            raise TelegramError(f"Не удалось отправить сообщение за {SEND_ATTEMPTS} попытки")
         except Exception as e:
-            logger.error('Отправка уведомления в телеграм была неудачна. Описание ошибки:')
+            logger.error(f'Отправка уведомления в телеграм чат {chat_id} была неудачна. Описание ошибки:')
             logger.error(e)
+            METRICS.inc('telegram_messages_total', result='failed')
             return False
@@ -0,0 +1,32 @@
+"""
+Общие настройки тестов.
+
+Модули проекта читают настройки из config.py, который не хранится в репозитории.
+Если config.py не найден, то тесты используют настройки-заглушки: к Google API и телеграм тесты не обращаются.
+"""
+import os
+import sys
+import tempfile
+import types
+
+import pytest
+
+try:
+    import config  # noqa: F401
+except ImportError:
+    config = types.ModuleType('config')
+    config.TOKEN_BOT = 'test'
+    config.AUTH_GOOGLE = {'GOOGLE_CLIENT_ID': 'test', 'GOOGLE_CLIENT_SECRET': 'test', 'KEY_WORKBOOK': 'workbook-0'}
+    config.FILE_NAME_LOG = os.path.join(tempfile.gettempdir(), 'task_time_guard_test.log')
+    config.TASK_ID_IGNOR = []
+    config.TASK_ID_MONITOR = '1'
+    sys.modules['config'] = config
+
+
+@pytest.fixture
+def telegram_server():
+    from benchmarks.fake_telegram import FakeTelegramServer
+
+    server = FakeTelegramServer().start()
+    yield server
+    server.stop()
@@ -0,0 +1,116 @@
+import time
+
+from services.telegram import alert_queue
+from services.telegram.alert_queue import AlertQueue, AlertSender
+
+
+def message(text: str) -> dict:
+    return {'text': text, 'keyboard': None}
+
+
+def due_texts(queue: AlertQueue, now: float = None) -> list[tuple[str, str]]:
+    return [(chat_id, msg['text']) for _, chat_id, msg in queue.due(now)]
+
+
+class Telegram:
+    """Клиент телеграм, отправка сообщений которого завершается заданными результатами"""
+    def __init__(self, fail: set[str] = ()):
+        self.fail = set(fail)
+        self.sent: list[tuple[str, str]] = []
+
+    def send_chats(self, messages_chats: dict[str, list[dict]]) -> dict[str, list]:
+        results = {}
+        for chat_id, messages in messages_chats.items():
+            results[chat_id] = []
+            for msg in messages:
+                if msg['text'] in self.fail:
+                    results[chat_id] += [False]
+                    break
+                self.sent += [(chat_id, msg['text'])]
+                results[chat_id] += [True]
+            results[chat_id] += [None] * (len(messages) - len(results[chat_id]))
+        return results
+
+
+def test_pending_duplicates_skipped():
+    queue = AlertQueue(':memory:')
+    assert queue.put([message('1'), message('2')], ['-1']) == 2
+    assert queue.put([message('1')], ['-1', '-2']) == 1
+
+    queue.mark_sent([row_id for row_id, _, _ in queue.due()])
+    # После отправки такое же сообщение снова добавляется
+    assert queue.put([message('1')], ['-1']) == 1
+
+
+def test_failed_message_retried_with_backoff():
+    queue = AlertQueue(':memory:')
+    queue.put([message('1')], ['-1'])
+    row_id = queue.due()[0][0]
+
+    time_start = time.time()
+    queue.mark_failed([row_id], 'error')
+    first = queue.next_attempt() - time_start
+    queue.mark_failed([row_id], 'error')
+    second = queue.next_attempt() - time_start
+
+    assert alert_queue.RETRY_BASE <= first < alert_queue.RETRY_BASE + 1
+    assert 2 * alert_queue.RETRY_BASE <= second < 2 * alert_queue.RETRY_BASE + 1
+    assert queue.due() == []
+    assert due_texts(queue, time_start + second + 1) == [('-1', '1')]
+
+
+def test_messages_after_failed_one_wait_for_it():
+    queue = AlertQueue(':memory:')
+    queue.put([message('1'), message('2')], ['-1', '-2'])
+    telegram = Telegram(fail={'1'})
+    sender = AlertSender(queue, lambda: telegram)
+
+    assert sender.process() == 0
+    # Сообщение '2' не отправлено раньше неотправленного '1' ни в один чат
+    assert telegram.sent == []
+    assert queue.due() == []
+    next_attempt = queue.next_attempt()
+    assert next_attempt > time.time()
+
+    queue.put([message('3')], ['-1'])
+    assert queue.due() == []
+    assert due_texts(queue, next_attempt) == [('-1', '1'), ('-1', '2'), ('-2', '1'), ('-2', '2'), ('-1', '3')]
+
+
+def test_sender_keeps_order_within_chat():
+    queue = AlertQueue(':memory:')
+    queue.put([message('1'), message('2')], ['-1'])
+    queue.put([message('3')], ['-2'])
+    telegram = Telegram(fail={'1'})
+    sender = AlertSender(queue, lambda: telegram)
+
+    assert sender.process() == 1
+    assert telegram.sent == [('-2', '3')]
+    assert len(queue) == 2
+
+
+def test_queue_survives_reopen(tmp_path):
+    path = str(tmp_path / 'alert_queue.db')
+    queue = AlertQueue(path)
+    queue.put([message('1'), message('2')], ['-1'])
+    queue.mark_sent([queue.due()[0][0]])
+
+    reopened = AlertQueue(path)
+
+    assert len(reopened) == 1
+    assert due_texts(reopened) == [('-1', '2')]
+    assert reopened.put([message('2')], ['-1']) == 0
+
+
+def test_purge_removes_expired_and_old_sent():
+    queue = AlertQueue(':memory:')
+    queue.put([message('1'), message('2')], ['-1'])
+    queue.mark_sent([queue.due()[0][0]])
+    now = time.time()
+
+    assert queue.purge(now) == 0
+    assert queue.purge(now + alert_queue.MESSAGE_MAX_AGE + 1) == 1
+    assert len(queue) == 0
+    # Отправленное сообщение старше SENT_KEEP тоже удалено
+    assert queue._conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0] == 0
+
@@ -0,0 +1,55 @@
+import datetime as dt
+
+from services.google_table.task import Task
+from services.monitoring.alert_state import AlertState
+
+NOW = dt.datetime(2024, 3, 1, 12, 0)
+
+
+def make_task(task_id: str, last_start: dt.datetime = NOW - dt.timedelta(hours=1)) -> Task:
+    return Task(task_id, f'Задача {task_id}', dt.time(0, 0), dt.time(23, 59), 60, '', '', NOW, False, '',
+                last_start, '', '', 2, '')
+
+
+def make_alert(task: Task) -> dict:
+    return {'task_id': task.task_id, 'task_name': task.task_name, 'task_last_start': task.last_start,
+            'time_interval': task.task_interval, 'task_delta_interval': 3600, 'repeat': task.repeat,
+            'workbook': task.workbook}
+
+
+def test_alert_selected_until_marked_notified():
+    state = AlertState(':memory:')
+    task = make_task('1')
+
+    alerts, _ = state.filter_alerts([make_alert(task)], [task], now=NOW)
+    assert len(alerts) == 1 and len(state) == 0
+    # Уведомление не поставлено в очередь: тревога отбирается снова
+    alerts, _ = state.filter_alerts([make_alert(task)], [task], now=NOW)
+    assert len(alerts) == 1
+
+    state.mark_notified(alerts, now=NOW)
+    alerts, _ = state.filter_alerts([make_alert(task)], [task], now=NOW)
+    assert alerts == [] and len(state) == 1
+
+
+def test_recovered_task_removed_after_marked_notified():
+    state = AlertState(':memory:')
+    task = make_task('1')
+    state.mark_notified([make_alert(task)], now=NOW)
+    task_started = make_task('1', NOW)
+
+    _, recovered = state.filter_alerts([], [task_started], now=NOW)
+    assert [task['task_id'] for task in recovered] == ['1'] and len(state) == 1
+
+    state.mark_notified([], recovered, now=NOW)
+    assert len(state) == 0
+
+
+def test_state_of_removed_and_ignored_tasks_deleted():
+    state = AlertState(':memory:', task_id_ignor=['2'])
+    tasks = [make_task(task_id) for task_id in ('1', '2', '3')]
+    state.mark_notified([make_alert(task) for task in tasks], now=NOW)
+
+    # Задача 3 удалена из таблицы, задача 2 больше не проверяется
+    state.filter_alerts([], tasks[:2], now=NOW)
+    assert len(state) == 1
@@ -0,0 +1,77 @@
+"""
+Нагрузочные проверки цикла мониторинга на имитациях Google API и Telegram Bot API (pytest-benchmark).
+Кроме времени цикла проверяется количество обращений к Google API за цикл и доставка тревог.
+Только нагрузочные проверки: python -m pytest tests/test_bench_cycle.py --benchmark-only
+"""
+import pytest
+
+import main
+from benchmarks import workload
+from services.common.token_bucket import TokenBucket
+from services.google_table.google_tb_work import open_workbooks
+from services.monitoring.alert_state import AlertState
+from services.monitoring.deadline_scheduler import DeadlineScheduler
+from services.telegram.alert_queue import AlertQueue
+from services.telegram.send_teleg import NotifTelegram
+
+COUNT_CHATS = 2
+
+
+@pytest.fixture
+def monitoring(tmp_path, telegram_server):
+    """Создаём таблицы с имитацией Google API и возвращаем функцию, готовящую новый запуск мониторинга"""
+    def setup(count_workbooks: int = 1, count_tasks: int = 100):
+        gc, keys = workload.make_client(count_workbooks, count_tasks, COUNT_CHATS, overdue=0.1,
+                                        monitor_task_id=main.TASK_ID_MONITOR)
+        wks = open_workbooks(keys, gc, quota=TokenBucket(1000, 1000))
+        for wk in wks:
+            wk.CONFIG_CACHE_DIR = str(tmp_path / str(id(gc)))
+        main.setup(wks, NotifTelegram(api_url=telegram_server.url), AlertState(':memory:'), AlertQueue(':memory:'))
+        return gc
+
+    yield setup
+    main.close_notif_telegram()
+
+
+def deliver_alerts(telegram_server) -> list[tuple[float, str, str]]:
+    """Отправляем все уведомления из очереди и получаем сообщения, принятые имитацией телеграм"""
+    while main.alert_sender.process():
+        pass
+    assert len(main.alert_queue) == 0
+    return telegram_server.pop_messages()
+
+
+@pytest.mark.parametrize('count_workbooks, count_tasks', [(1, 100), (1, 1000), (4, 100)])
+def test_first_cycle(benchmark, monitoring, telegram_server, count_workbooks, count_tasks):
+    rounds = []
+
+    def setup():
+        rounds.append(monitoring(count_workbooks, count_tasks))
+        telegram_server.pop_messages()
+
+    count_api_calls = benchmark.pedantic(main.monitor_tasks, setup=setup, rounds=3)
+
+    # В каждой таблице open_by_key, worksheets, один values_batch_get и запись времени работы в основную таблицу
+    assert count_api_calls == 3 * count_workbooks + 1
+    assert rounds[-1].count_requests == count_api_calls
+    # Тревоги доставлены во все чаты, тревоги дополнительных таблиц помечены идентификатором таблицы
+    messages = deliver_alerts(telegram_server)
+    assert len({chat_id for _, chat_id, _ in messages}) == COUNT_CHATS
+    for key in list(rounds[-1].workbooks)[1:]:
+        assert any(key in text for _, _, text in messages)
+
+
+@pytest.mark.parametrize('count_tasks', [100, 1000])
+def test_incremental_cycle(benchmark, monitoring, telegram_server, count_tasks):
+    gc = monitoring(1, count_tasks)
+    scheduler = DeadlineScheduler(main.TASK_ID_IGNOR)
+    main.monitor_tasks(scheduler, incremental=True)
+    assert deliver_alerts(telegram_server)
+
+    count_api_calls = benchmark(main.monitor_tasks, scheduler, incremental=True)
+
+    # Колонки 'task_id' и 'last_start' одним запросом и запись времени работы
+    assert count_api_calls == 2
+    assert gc.count_errors == {}
+    # Повторные уведомления по уже известным тревогам не отправляются
+    assert deliver_alerts(telegram_server) == []
@@ -0,0 +1,54 @@
+import datetime as dt
+
+from services.google_table.task import Task
+from services.monitoring.deadline_scheduler import DeadlineScheduler
+
+DAY = dt.date(2024, 3, 1)
+
+
+def at(hour: int, minute: int = 0, second: int = 0, day: dt.date = DAY) -> dt.datetime:
+    return dt.datetime.combine(day, dt.time(hour, minute, second))
+
+
+def make_task(last_start: dt.datetime, task_id: str = '1') -> Task:
+    """Задача с рабочим временем 09:00-18:00 и интервалом запуска 1 час"""
+    return Task(task_id, f'Задача {task_id}', dt.time(9, 0), dt.time(18, 0), 3600, '', '', last_start, False, '',
+                last_start, '', '', 2, '')
+
+
+NEXT_MORNING = at(9, 0, 20, DAY + dt.timedelta(days=1))
+
+
+def test_deadline_of_overdue_task_not_in_past():
+    scheduler = DeadlineScheduler()
+    # Задача просрочена в 17:03:01, планировщик обновляется в 22:00 вне её рабочего времени
+    scheduler.update([make_task(at(14, 3))], now=at(22))
+
+    assert scheduler.next_deadline() == NEXT_MORNING
+    assert scheduler.pop_due(at(22)) == []
+
+
+def test_overdue_task_checked_now_in_working_time():
+    scheduler = DeadlineScheduler()
+    task = make_task(at(14, 3))
+    scheduler.update([task], now=at(17, 30))
+
+    assert scheduler.next_deadline() == at(17, 30)
+    assert scheduler.pop_due(at(17, 30)) == [task]
+
+
+def test_task_due_outside_working_time_kept_until_next_start():
+    scheduler = DeadlineScheduler()
+    task = make_task(at(14, 3))
+    scheduler.update([task], now=at(16))
+    assert scheduler.next_deadline() == at(17, 3, 1)
+
+    # Срок проверки наступил, когда рабочее время задачи уже закончилось
+    assert scheduler.pop_due(at(22)) == []
+    assert scheduler.next_deadline() == NEXT_MORNING
+    assert len(scheduler) == 1
+    # Задача не запускалась: при обновлении из таблицы срок не меняется
+    scheduler.update([task], now=at(23))
+    assert scheduler.next_deadline() == NEXT_MORNING
+
+    assert scheduler.pop_due(NEXT_MORNING) == [task]
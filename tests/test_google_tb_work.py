@@ -0,0 +1,176 @@
+import datetime as dt
+
+import pytest
+
+from benchmarks import workload
+from benchmarks.fake_gspread import FakeClient, FakeWorksheet
+from services.common.token_bucket import TokenBucket
+from services.google_table import google_tb_work
+from services.google_table.google_tb_work import WorkGoogle
+
+KEY = 'workbook-0'
+
+
+def make_workbook(tmp_path, count_tasks: int = 10) -> tuple[FakeClient, WorkGoogle]:
+    gc = FakeClient({KEY: workload.workbook_sheets(count_tasks, 1)})
+    wk = WorkGoogle(KEY, gc, quota=TokenBucket(1000, 1000))
+    wk.CONFIG_CACHE_DIR = str(tmp_path)
+    return gc, wk
+
+
+def run_cycle(wk: WorkGoogle, incremental: bool = False) -> tuple[int, list]:
+    wk.start_cycle(incremental)
+    tasks = wk.get_tasks(incremental)
+    assert wk.users_alert_notif()
+    return wk.end_cycle(), tasks
+
+
+def test_cycle_reads_all_sheets_with_one_request(tmp_path):
+    gc, wk = make_workbook(tmp_path)
+
+    count_api_calls, tasks = run_cycle(wk)
+
+    # open_by_key и worksheets при первом открытии таблицы и один values_batch_get
+    assert count_api_calls == 3
+    assert gc.count_requests == 3
+    assert len(tasks) == 10
+
+
+def test_next_cycle_does_not_reopen_workbook(tmp_path):
+    gc, wk = make_workbook(tmp_path)
+    run_cycle(wk)
+
+    count_api_calls, tasks = run_cycle(wk)
+
+    # Таблица уже открыта, страницы настроек берутся из сохранённых копий
+    assert count_api_calls == 1
+    assert gc.count_requests == 4
+    assert len(tasks) == 10
+
+
+def test_workbook_reopened_after_sheet_renamed(tmp_path):
+    gc, wk = make_workbook(tmp_path)
+    run_cycle(wk)
+    # Объекты страниц gspread хранят имя, полученное при открытии таблицы
+    sheets = gc.workbooks[KEY].sheets
+    sheets[1] = FakeWorksheet(gc, 'Задачи', sheets[1].values)
+
+    # Пакетный запрос со старым именем страницы отклоняется (400), таблица открывается заново
+    count_api_calls, tasks = run_cycle(wk)
+    assert gc.count_errors == {400: 1}
+    assert len(tasks) == 10
+
+    count_api_calls, tasks = run_cycle(wk)
+    assert count_api_calls == 1
+    assert len(tasks) == 10
+
+
+def test_incremental_read_detects_deleted_row(tmp_path):
+    gc, wk = make_workbook(tmp_path)
+    run_cycle(wk, incremental=True)
+    values = gc.workbooks[KEY].sheets[1].values
+    del values[3]
+
+    count_api_calls, tasks = run_cycle(wk, incremental=True)
+
+    # Колонка 'task_id' не совпала с сохранёнными строками, страница задач прочитана полностью
+    assert count_api_calls == 2
+    assert not wk.tasks_errors
+    assert [(task.task_id, task.last_start.strftime('%Y-%m-%d %H:%M:%S')) for task in tasks] == \
+        [(row[0], row[10]) for row in values[1:]]
+    assert wk.find_task_row(values[3][0]) == 4
+
+
+def test_incremental_read_keeps_cached_rows(tmp_path):
+    gc, wk = make_workbook(tmp_path)
+    run_cycle(wk, incremental=True)
+    values = gc.workbooks[KEY].sheets[1].values
+    values[2][10] = '2024-01-01 00:00:00'
+
+    count_api_calls, tasks = run_cycle(wk, incremental=True)
+
+    assert count_api_calls == 1
+    assert tasks[1].last_start.strftime('%Y-%m-%d %H:%M:%S') == '2024-01-01 00:00:00'
+
+
+def test_task_table_updated_in_place(tmp_path):
+    gc, wk = make_workbook(tmp_path)
+    run_cycle(wk, incremental=True)
+    last_start = wk.task_table.last_start
+    values = gc.workbooks[KEY].sheets[1].values
+    values[2][10] = '2024-01-01 00:00:00'
+
+    _, tasks = run_cycle(wk, incremental=True)
+
+    # Массивы не создаются заново, обновляется только изменившаяся строка
+    assert wk.task_table.last_start is last_start
+    assert wk.task_table.tasks == tasks
+    assert last_start[1] == tasks[1].last_start.timestamp()
+
+    del values[3]
+    _, tasks = run_cycle(wk, incremental=True)
+    assert wk.task_table.tasks == tasks
+    assert len(wk.task_table.last_start) == len(tasks)
+
+
+def test_failed_read_returns_none_and_keeps_last_tasks(tmp_path):
+    gc, wk = make_workbook(tmp_path)
+    _, tasks = run_cycle(wk)
+
+    # Пакетный запрос и повторное открытие таблицы отклоняются
+    gc.fail_next(403, 403)
+    wk.start_cycle()
+    assert wk.get_tasks() is None
+    wk.end_cycle()
+
+    assert wk.last_tasks == tasks
+
+
+def test_snapshots_readable_only_by_owner(tmp_path):
+    _, wk = make_workbook(tmp_path)
+    run_cycle(wk)
+
+    snapshots = list(tmp_path.glob('*.json'))
+    assert snapshots
+    assert all(path.stat().st_mode & 0o777 == 0o600 for path in snapshots)
+
+
+def test_user_reorder_auto_parsed(tmp_path):
+    gc, wk = make_workbook(tmp_path)
+    gc.workbooks[KEY].sheets[4].values = [
+        ['user_id', 'manager_id', 'user_name', 'user_reorder_auto'],
+        ['1', '1', 'Пользователь 1', 'Да'], ['2', '1', 'Пользователь 2', 'нет'], ['3', '1', 'Пользователь 3', ''],
+    ]
+
+    users = wk.get_user_reorder_auto()
+
+    assert [user['user_reorder_auto'] for user in users] == [True, False, None]
+
+
+def test_cold_queue_last_start_reads_only_task_ids(tmp_path, monkeypatch):
+    gc, wk = make_workbook(tmp_path)
+    tasks_sheet = gc.workbooks[KEY].sheets[1]
+    task_id = tasks_sheet.values[5][0]
+    monkeypatch.setattr(tasks_sheet, 'get_all_values', lambda: pytest.fail("Прочитана вся страница задач"))
+
+    wk.queue_last_start('2030-01-01 12:00:00', task_id=task_id)
+    assert wk.flush_last_start()
+
+    # open_by_key, worksheets, values_get колонки 'task_id' и batch_update
+    assert gc.count_requests == 4
+    assert tasks_sheet.values[5][10] == '2030-01-01 12:00:00'
+
+
+def test_cached_task_date_start_clipped_at_reuse(tmp_path, monkeypatch):
+    gc, wk = make_workbook(tmp_path)
+    gc.workbooks[KEY].sheets[1].values[1][7] = '01.01.2000'
+    run_cycle(wk)
+
+    # Через 10 дней строка не изменилась, но дата начала загрузки заказов снова ограничена годом
+    utc_now = dt.datetime.utcnow() + dt.timedelta(days=10)
+    monkeypatch.setattr(google_tb_work.dt, 'datetime', type('datetime', (dt.datetime,), {
+        'utcnow': staticmethod(lambda: utc_now)}))
+    _, tasks_next = run_cycle(wk)
+
+    assert (utc_now - tasks_next[0].date_start).days == 364
+    assert wk.task_table.tasks == tasks_next
@@ -0,0 +1,29 @@
+import datetime as dt
+
+from services.monitoring.heartbeat_server import HeartbeatStore
+
+NOW = dt.datetime(2024, 3, 1, 12, 0)
+
+
+def test_only_known_tasks_stored():
+    store = HeartbeatStore()
+    assert store.beat('1', NOW)
+    assert store.beat('other-workbook:3', NOW)
+
+    store.set_known(['1', '2'])
+    assert store.get('other-workbook:3') is None
+    assert not store.beat('other-workbook:3', NOW)
+    assert store.beat('2', NOW)
+
+    assert store.pop_updates() == {'1': NOW, '2': NOW}
+    assert store.count_rejected == 1
+
+
+def test_store_size_capped_before_tasks_known():
+    store = HeartbeatStore(max_tasks=2)
+    assert store.beat('1', NOW) and store.beat('2', NOW)
+
+    assert not store.beat('3', NOW)
+    # Сигнал уже сохранённой задачи принимается
+    assert store.beat('1', NOW)
+    assert len(store.pop_updates()) == 2
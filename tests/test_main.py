@@ -0,0 +1,105 @@
+import datetime as dt
+
+import pytest
+
+import main
+from benchmarks import workload
+from services.common.metrics import METRICS
+from services.common.token_bucket import TokenBucket
+from services.google_table.google_tb_work import open_workbooks
+from services.monitoring.alert_state import AlertState
+from services.monitoring.deadline_scheduler import DeadlineScheduler
+from services.monitoring.heartbeat_server import HeartbeatStore
+from services.monitoring.task_table import TaskTable
+from services.telegram.alert_queue import AlertQueue
+from services.telegram.send_teleg import NotifTelegram
+
+
+@pytest.fixture
+def gc(tmp_path):
+    gc, keys = workload.make_client(1, 20, 1, overdue=0.5, monitor_task_id=main.TASK_ID_MONITOR)
+    wks = open_workbooks(keys, gc, quota=TokenBucket(1000, 1000))
+    wks[0].CONFIG_CACHE_DIR = str(tmp_path)
+    # Страница получателей тревог читается в каждом цикле
+    wks[0].CONFIG_SHEETS_TTL = {**wks[0].CONFIG_SHEETS_TTL, 5: -1}
+    main.setup(wks, NotifTelegram(api_url='http://127.0.0.1:9'), AlertState(':memory:'), AlertQueue(':memory:'))
+    return gc
+
+
+def test_alert_not_lost_without_recipients(gc):
+    recipients_sheet = next(iter(gc.workbooks.values())).sheets[5]
+    recipients = recipients_sheet.values
+    recipients_sheet.values = recipients[:1]
+    main.monitor_tasks()
+    assert len(main.alert_queue) == 0 and len(main.alert_state) == 0
+
+    recipients_sheet.values = recipients
+    main.monitor_tasks()
+    assert len(main.alert_queue) > 0 and len(main.alert_state) > 0
+
+
+def test_failed_read_keeps_tasks(gc):
+    scheduler = DeadlineScheduler(main.TASK_ID_IGNOR)
+    main.monitor_tasks(scheduler, incremental=True)
+    count_tasks, count_alerts = len(scheduler), len(main.alert_state)
+    assert count_tasks and count_alerts
+
+    # Пакетный запрос, повторное открытие таблицы и чтение страницы задач отклоняются
+    gc.fail_next(403, 403, 403)
+    main.monitor_tasks(scheduler, incremental=True)
+
+    assert len(scheduler) == count_tasks
+    assert len(main.alert_state) == count_alerts
+    assert len(main.wk_g.last_tasks) == 20
+
+
+def test_monitor_task_optional(gc, monkeypatch):
+    tasks_sheet = next(iter(gc.workbooks.values())).sheets[1]
+    monkeypatch.setattr(main, 'TASK_ID_MONITOR', None)
+    last_start = [row[10] for row in tasks_sheet.values]
+
+    main.monitor_tasks()
+
+    assert [row[10] for row in tasks_sheet.values] == last_start
+
+
+def overdue_gauge() -> float:
+    return next(gauge['value'] for gauge in METRICS.to_dict()['gauges'] if gauge['name'] == 'tasks_overdue')
+
+
+def test_overdue_gauge_not_accumulated(gc, monkeypatch):
+    scheduler = DeadlineScheduler(main.TASK_ID_IGNOR)
+    main.monitor_tasks()
+    overdue = overdue_gauge()
+    assert overdue
+
+    main.monitor_tasks()
+    assert overdue_gauge() == overdue
+    main.monitor_tasks(scheduler, incremental=True)
+    # В режиме планировщика просроченные задачи считаются по таблицам задач Google таблиц,
+    # а не по новой таблице из всех задач
+    tables = []
+    monkeypatch.setattr(main, 'TaskTable', lambda tasks, *args: tables.append(len(tasks)) or TaskTable(tasks, *args))
+    main.monitor_tasks(scheduler, incremental=True)
+    assert overdue_gauge() == overdue
+    assert all(count < 20 for count in tables)
+
+
+def test_heartbeat_of_unknown_workbook_not_written(gc):
+    tasks_sheet = next(iter(gc.workbooks.values())).sheets[1]
+    heartbeats = HeartbeatStore()
+    moment = dt.datetime(2030, 1, 1, 12, 0)
+    main.monitor_tasks()
+    task_id, other_task_id = tasks_sheet.values[3][0], tasks_sheet.values[4][0]
+    last_start = tasks_sheet.values[3][10]
+
+    heartbeats.beat(f'other-workbook:{task_id}', moment)
+    heartbeats.beat(other_task_id, moment)
+    main.monitor_tasks(heartbeats=heartbeats)
+
+    rows = {row[0]: row for row in tasks_sheet.values[1:]}
+    assert rows[task_id][10] == last_start
+    assert rows[other_task_id][10] == '2030-01-01 12:00:00'
+    assert heartbeats.get(f'other-workbook:{task_id}') is None
+    # Время из сигнала подставлено в таблицу задач основной Google таблицы
+    assert main.wk_g.task_table.last_start.max() == moment.timestamp()
@@ -0,0 +1,58 @@
+import time
+
+from services.telegram import send_teleg
+from services.telegram.send_teleg import NotifTelegram
+
+
+def test_sends_reuse_connections(telegram_server):
+    telegram = NotifTelegram(api_url=telegram_server.url)
+    messages = [{'text': f'Сообщение {i}', 'keyboard': None} for i in range(2)]
+
+    results = [telegram.send_chats({'-1': messages, '-2': messages}) for _ in range(2)]
+    telegram.close()
+
+    assert results == [{'-1': [True, True], '-2': [True, True]}] * 2
+    assert len(telegram_server.pop_messages()) == 8
+    # Соединения открываются при первой отправке и переиспользуются следующими
+    assert telegram_server.count_connections <= 2
+
+
+def test_send_massage_chat_uses_async_sender(telegram_server):
+    telegram = NotifTelegram(api_url=telegram_server.url)
+    telegram.message = {'text': 'Тревога', 'keyboard': None}
+
+    assert telegram.send_massage_chat('-1')
+    telegram.close()
+    assert [message[1:] for message in telegram_server.pop_messages()] == [('-1', 'Тревога')]
+
+
+def test_rate_limited_chat_paused_and_retried(telegram_server):
+    telegram = NotifTelegram(api_url=telegram_server.url)
+    messages = [{'text': f'Сообщение {i}', 'keyboard': None} for i in range(2)]
+    telegram_server.fail_next(1)
+
+    time_start = time.monotonic()
+    results = telegram.send_chats({'1': messages})
+    elapsed = time.monotonic() - time_start
+    telegram.close()
+
+    assert results == {'1': [True, True]}
+    assert telegram_server.count_requests == 3
+    assert [message[1:] for message in telegram_server.pop_messages()] == \
+        [('1', 'Сообщение 0'), ('1', 'Сообщение 1')]
+    # Отправка в чат приостановлена на время retry_after из ответа 429
+    assert elapsed >= telegram_server.retry_after
+
+
+def test_chat_stops_after_failed_message(telegram_server):
+    telegram = NotifTelegram(api_url=telegram_server.url)
+    messages = [{'text': f'Сообщение {i}', 'keyboard': None} for i in range(2)]
+    telegram_server.fail_next(send_teleg.SEND_ATTEMPTS)
+
+    results = telegram.send_chats({'1': messages})
+    telegram.close()
+
+    # Попытки первого сообщения исчерпаны, второе не отправляется, чтобы не нарушить порядок
+    assert results == {'1': [False, None]}
+    assert telegram_server.count_requests == send_teleg.SEND_ATTEMPTS
+    assert telegram_server.pop_messages() == []
@@ -0,0 +1,39 @@
+import datetime as dt
+
+import numpy as np
+
+from services.google_table.task import Task
+from services.monitoring.task_table import TaskTable
+
+NOW = dt.datetime(2024, 3, 1, 12, 0)
+
+
+def make_task(task_id: str, last_start: dt.datetime, time_start: dt.time = dt.time(0, 0)) -> Task:
+    return Task(task_id, f'Задача {task_id}', time_start, dt.time(23, 59), 60, '', '', NOW, False, '',
+                last_start, '', '', int(task_id) + 1, '')
+
+
+def test_update_changed_positions_matches_full_rebuild():
+    tasks = [make_task(str(i), NOW - dt.timedelta(seconds=30 * i)) for i in range(1, 11)]
+    table = TaskTable(tasks, task_id_ignor=['3'])
+    interval = table.interval
+
+    tasks[1] = make_task('2', NOW)
+    tasks[4] = make_task('5', NOW - dt.timedelta(hours=1), time_start=dt.time(13, 0))
+    table.update(tasks, changed=[1, 4])
+
+    expected = TaskTable(tasks, task_id_ignor=['3'])
+    assert table.interval is interval
+    for name in ('last_start', 'interval', 'time_start', 'time_finish', 'ignore'):
+        assert np.array_equal(getattr(table, name), getattr(expected, name))
+    assert table.check_time_interval(NOW) == expected.check_time_interval(NOW)
+    assert table.count_overdue(NOW) == len(expected.check_time_interval(NOW))
+
+
+def test_update_rebuilds_when_count_changed():
+    tasks = [make_task(str(i), NOW) for i in range(1, 4)]
+    table = TaskTable(tasks)
+
+    table.update(tasks[:2], changed=[])
+
+    assert len(table) == 2 and len(table.last_start) == 2